@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """Answer cache keyed by query embedding, matched by cosine similarity."""
+
+    def __init__(self, threshold=0.95, ttl=3600, max_entries=1000):
+        self.threshold = threshold
+        self.ttl = ttl  # seconds, 0 disables expiry
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # id -> (scope, unit vector, answer, created)
+        self._next_id = 0
+        self._versions = {}  # scope -> bumped whenever its document changes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, query_vector, scope):
+        vector = self._normalise(query_vector)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            best_id, best_score = None, -1.0
+            for entry_id, (entry_scope, entry_vector, _, _) in self._entries.items():
+                if entry_scope != scope:
+                    continue
+                score = float(np.dot(vector, entry_vector))
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is not None and best_score >= self.threshold:
+                self._entries.move_to_end(best_id)
+                self.hits += 1
+                return self._entries[best_id][2]
+            self.misses += 1
+            return None
+
+    def version(self, scope):
+        with self._lock:
+            return self._versions.get(scope, 0)
+
+    def store(self, query_vector, scope, answer, version=None):
+        if query_vector is None:
+            return
+        vector = self._normalise(query_vector)
+        with self._lock:
+            # Skip answers computed against a document that has since changed
+            if version is not None and self._versions.get(scope, 0) != version:
+                return
+            self._entries[self._next_id] = (scope, vector, answer, time.time())
+            self._next_id += 1
+            while self.max_entries and len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, scope):
+        # Drop answers for a document, plus any answer searched across all documents
+        with self._lock:
+            for key in (scope, "*"):
+                self._versions[key] = self._versions.get(key, 0) + 1
+            stale = [entry_id for entry_id, entry in self._entries.items() if entry[0] in (scope, "*")]
+            for entry_id in stale:
+                del self._entries[entry_id]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "threshold": self.threshold,
+            }
+
+    def _expire(self, now):
+        if not self.ttl:
+            return
+        # Entries are kept in insertion/use order, but use refreshes the order,
+        # so scan everything rather than stopping at the first fresh entry
+        stale = [entry_id for entry_id, entry in self._entries.items() if now - entry[3] > self.ttl]
+        for entry_id in stale:
+            del self._entries[entry_id]
+
+    @staticmethod
+    def _normalise(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
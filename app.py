@@ -8,6 +8,7 @@ from langchain.vectorstores import FAISS
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, GoogleGenerativeAI
 from langchain.chains.question_answering import load_qa_chain
 import google.generativeai as genai
+from timetable import TimetableIndex, format_timetable, load_timetable, parse_timetable
 
 # Load environment variables
 load_dotenv()
@@ -74,11 +75,25 @@ def main():
             vector_store = FAISS.from_texts(chunks, embedding=embeddings)
             vector_store.save_local(store_path)
 
+        # Structured timetable for this document, if one has been parsed
+        table = load_timetable(f"timetables/{store_name}.json")
+        if table is None:
+            events = parse_timetable(text)
+            table = {"events": events} if events else None
+        timetable_index = TimetableIndex(table["events"]) if table else None
+        timetable_text = format_timetable(table["events"]) if table else ""
+
         # Accept user questions/query
         query = st.text_input("💬 Ask a question about Orientation:")
         
 
         if query:
+            # Simple where/when questions are answered straight from the timetable
+            direct = timetable_index.answer(query) if timetable_index else None
+            if direct:
+                st.markdown(f'<div style="background-color:#f4f4f4;padding:10px;border-radius:10px;">{direct}</div>', unsafe_allow_html=True)
+                return
+
             with st.spinner("Finding information..."):
                 docs = vector_store.similarity_search(query=query, k=5)
 
@@ -99,22 +114,10 @@ def main():
                     f"Based on the given information and text, answer the question: '{query}' in detail."
                     f"Example 1: Question: Where is the Explore Booth?; Response: The Explore Booth is in Block E"
                     f"Example 2: Question: What is the venue of Network with Lecturers and Peers?; Response: The Network with Lecturers and Peers is in Multi-Purpose Hall"
-                    f"""Detail orientation timetable information:
-                    09:00 AM - 09:05 AM : Welcome Speech by Deputy Vice-Chancellor, Singapore; Welcome Speech by Acting Campus Dean & Head of Learning, Teaching and Student Engagement - Venue: Block C
-                    09:05 AM - 09:10 AM : JCU 101 - Venue: Block C
-                    09:10 AM to 10:25 AM : DigiLearn Workshop & Academic Advising - Venue: Block C
-                    10:40 AM - 11:40 AM : Diploma and Bachelor of Business Programs - Venue: Block C
-                    10:40 AM - 11:40 AM : Postgraduate Business and Postgraduate Qualifying; Programs - Business - Venue: Block C
-                    10:40 AM - 11:40 AM : Bachelor of Environmental Science Programs - Venue: Block C
-                    10:40 AM - 11:40 AM : Diploma and Bachelor of Arts and Psychological Science Programs - Venue: Block C
-                    10:40 AM - 11:40 AM : Master of Psychological Science, Graduate Diploma of Psychology and Graduate Certificate of Psychological Science Programs - Venue: Block C
-                    10:40 AM - 11:40 AM : Diploma, Bachelor, and Master of Information Technology and Science Programs - Venue: Block C
-                    10:40 AM - 11:40 AM : Pre-University Foundation Programs - Venue: Block C
-                    10:40 AM - 11:40 AM : Introduction to ELPP - Venue: Block C
-                    01:30 PM to 03:00 PM : Explore Booths - Venue: Block E
-                    03:00 PM to 05:00 PM : Network with Lecturers and Peers - Venue: Multipurpose Hall
-                    """
                 )
+                # Timetable parsed from the schedule document instead of a hardcoded block
+                if timetable_text:
+                    prompt += f"Detail orientation timetable information:\n{timetable_text}\n"
                 
                 llm = GoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.2)  # Adjust temperature
                 chain = load_qa_chain(llm=llm, chain_type="stuff")
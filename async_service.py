@@ -0,0 +1,65 @@
+import asyncio
+import re
+import threading
+
+
+def normalise_question(question):
+    # Questions that differ only in case, spacing or punctuation share one key
+    question = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(question.split())
+
+
+class AsyncChatService:
+    """Runs the chat path on a shared asyncio loop.
+
+    Upstream calls are capped by a semaphore, and identical in-flight
+    questions are coalesced so they all await a single computation.
+    """
+
+    def __init__(self, max_concurrency=4):
+        self.max_concurrency = max_concurrency
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="chat-loop", daemon=True)
+        self._thread.start()
+        self._semaphore = None
+        self._inflight = {}  # key -> asyncio.Task, only touched on the loop thread
+        self.active_upstream = 0
+        self.computed = 0
+        self.coalesced = 0
+
+    def run(self, key, factory, timeout=None):
+        # Called from Flask worker threads: block until the shared result is ready
+        future = asyncio.run_coroutine_threadsafe(self._single_flight(key, factory), self.loop)
+        return future.result(timeout)
+
+    async def upstream(self, awaitable):
+        # Bound the number of concurrent calls to the embedding/Gemini APIs
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            self.active_upstream += 1
+            try:
+                return await awaitable
+            finally:
+                self.active_upstream -= 1
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active_upstream": self.active_upstream,
+            "in_flight": len(self._inflight),
+            "computed": self.computed,
+            "coalesced": self.coalesced,
+        }
+
+    async def _single_flight(self, key, factory):
+        task = self._inflight.get(key)
+        if task is None:
+            self.computed += 1
+            task = self.loop.create_task(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shield so one caller timing out does not cancel the shared computation
+        return await asyncio.shield(task)
@@ -1,13 +1,33 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 import os
+import json
+import asyncio
 from dotenv import load_dotenv
-from PyPDF2 import PdfReader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.vectorstores import FAISS
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, GoogleGenerativeAI
 from langchain.chains.question_answering import load_qa_chain
-from langchain_community.vectorstores import FAISS
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+from store_registry import VectorStoreRegistry
+from answer_cache import SemanticAnswerCache
+from async_service import AsyncChatService, normalise_question
+from embedding_cache import EmbeddingCache, chunk_hash, embed_with_cache
+from ingest_jobs import IngestionQueue, PageExtractor
+from fallback import (FallbackTelemetry, SPECULATIVE, STRATEGIES, VERDICT, VERDICT_INSTRUCTIONS,
+                      parse_verdict, run_speculative, run_speculative_async)
+from context_packing import ContextPacker
+from conversation import ConversationStore, format_turn, needs_condensing
+from translation import PIVOT_LANGUAGE, TranslationCache, build_translation_prompt, resolve_language
+from lexical_index import BM25Index, merge_by_rank, reciprocal_rank_fusion
+from snapshot_store import SnapshotStore, file_hash, swap_directory, temporary_path, write_snapshot
+from vector_index import INDEX_TYPES
+from providers import embedding_model_name, make_embeddings, make_llm
+from metrics import MetricsRegistry, estimate_tokens, in_context, request_timings
+from upstream import BULK, INTERACTIVE, ScheduledEmbeddings, UpstreamBusy, UpstreamScheduler
+from faq import FaqIndex, load_faq, load_questions, questions_for, reusable_answers, save_faq
+from timetable import TimetableIndex, format_timetable, load_timetable, parse_timetable, save_timetable
+import threading
+import time
+import uuid
 
 # Loading Environment Variables
 load_dotenv()
@@ -16,9 +36,43 @@ print("Gemini API Key:", gemini_api_key)
 
 app = Flask(__name__)
 
-# Setting the PDF file path
-PDF_PATH = 'uploaded_pdfs/TR1S-Full-Time-Orientation-Schedule.pdf'
-STORE_PATH = "vector_stores/orientation"
+# Prometheus-style metrics, served on /metrics
+metrics = MetricsRegistry(enabled=os.getenv("METRICS_ENABLED", "1") == "1")
+stage_seconds = metrics.histogram("chatbot_stage_seconds", "Time spent in each chat stage", ("stage",))
+ingest_stage_seconds = metrics.histogram("chatbot_ingest_stage_seconds", "Time spent in each ingestion stage", ("stage",))
+chat_requests = metrics.counter("chatbot_chat_requests_total", "Chat requests by how they were answered", ("source",))
+llm_tokens = metrics.counter("chatbot_llm_tokens_total", "Estimated prompt/completion tokens sent to and received from the LLM", ("kind",))
+ingest_pages = metrics.counter("chatbot_ingest_pages_total", "PDF pages extracted by ingestion")
+ingest_chunks = metrics.counter("chatbot_ingest_chunks_total", "Chunks processed by ingestion", ("result",))
+ingest_pages_per_second = metrics.histogram(
+    "chatbot_ingest_pages_per_second", "Page extraction throughput per ingestion", buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000))
+ingest_chunks_per_second = metrics.histogram(
+    "chatbot_ingest_chunks_per_second", "Chunk throughput per ingestion", buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000))
+
+# Per-request timings: a Server-Timing header when TIMING_HEADER=1, a "timings" field when the payload asks for debug
+TIMING_HEADER = os.getenv("TIMING_HEADER", "0") == "1"
+
+
+@app.before_request
+def start_request_timings():
+    request_timings.set({})
+
+
+@app.after_request
+def report_request_timings(response):
+    timings = request_timings.get()
+    if not timings or response.is_streamed:
+        return response
+    if TIMING_HEADER:
+        response.headers["Server-Timing"] = ", ".join(
+            f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items())
+    payload = request.get_json(silent=True) if request.is_json else None
+    if isinstance(payload, dict) and payload.get("debug") and response.is_json:
+        data = response.get_json()
+        if isinstance(data, dict):
+            data["timings"] = {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()}
+            response.set_data(json.dumps(data))
+    return response
 
 # Set the storage path
 UPLOAD_FOLDER ="uploaded_pdfs"
@@ -27,35 +81,574 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(VECTOR_STORE_FOLDER, exist_ok=True)
 
 
+def store_path_for(pdf_name):
+    # Every uploaded PDF gets its own index shard, named after the file
+    store_name = os.path.basename(pdf_name).replace('.pdf', '')
+    return os.path.join(VECTOR_STORE_FOLDER, store_name)
+
+
+# Setting the PDF file path
+PDF_PATH = 'uploaded_pdfs/TR1S-Full-Time-Orientation-Schedule.pdf'
+STORE_PATH = store_path_for(PDF_PATH)
+
+# Shared embedding client and in-memory registry of loaded vector stores
+EMBEDDING_MODEL = "models/embedding-001"
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+
+def get_embeddings():
+    # The embedding client is created on first use rather than at import
+    global _embeddings
+    with _embeddings_lock:
+        if _embeddings is None:
+            _embeddings = make_embeddings(EMBEDDING_MODEL, gemini_api_key)
+        return _embeddings
+
+
+# Every embedding and LLM call is admitted by one scheduler: per-model request/token budgets,
+# interactive chat ahead of bulk ingestion, jittered retries, and a fast 429 when the queue is full
+LLM_MODEL = "gemini-2.0-flash"
+upstream_wait_seconds = metrics.histogram(
+    "chatbot_upstream_wait_seconds", "Time upstream calls waited in the admission queue", ("priority",))
+upstream = UpstreamScheduler(
+    # e.g. {"gemini-2.0-flash": {"rpm": 15, "tpm": 1000000}, "models/embedding-001": {"rpm": 1500}}
+    limits=json.loads(os.getenv("UPSTREAM_LIMITS", "{}")),
+    max_concurrency=int(os.getenv("UPSTREAM_CONCURRENCY", "8")),
+    max_queue=int(os.getenv("UPSTREAM_QUEUE_SIZE", "64")),
+    retries=int(os.getenv("UPSTREAM_RETRIES", "3")),
+    wait_histogram=upstream_wait_seconds,
+)
+# Longest an interactive call may wait for admission before the request is shed (0 waits indefinitely)
+CHAT_DEADLINE_SECONDS = float(os.getenv("UPSTREAM_CHAT_DEADLINE", "20"))
+BUSY_MESSAGE = "Error: The assistant is busy right now, please try again shortly."
+
+
+def deadline_for(priority):
+    # Bulk work (ingestion, FAQ answers) waits as long as it takes
+    if priority == BULK or not CHAT_DEADLINE_SECONDS:
+        return None
+    return time.monotonic() + CHAT_DEADLINE_SECONDS
+
+
+query_embeddings = ScheduledEmbeddings(get_embeddings, upstream, EMBEDDING_MODEL, INTERACTIVE, estimate_tokens,
+                                       CHAT_DEADLINE_SECONDS)
+bulk_embeddings = ScheduledEmbeddings(get_embeddings, upstream, EMBEDDING_MODEL, BULK, estimate_tokens)
+
+
+@app.errorhandler(UpstreamBusy)
+def upstream_busy(e):
+    response = jsonify({"response": BUSY_MESSAGE, "retry_after": e.retry_after})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response
+
+
+store_registry = VectorStoreRegistry(
+    max_entries=int(os.getenv("STORE_CACHE_MAX_ENTRIES", "8")),
+    max_bytes=int(os.getenv("STORE_CACHE_MAX_MB", "0")) * 1024 * 1024,
+)
+
+
+class Shard:
+    # A loaded index shard: the mapped snapshot plus the BM25 index built alongside it
+    def __init__(self, vectors, lexical):
+        self.vectors = vectors
+        self.lexical = lexical
+
+    def document(self, chunk_id):
+        return self.vectors.document(chunk_id)
+
+
+def shard_size(store_path, snapshot):
+    # What the registry memory budget charges for a shard: the search index (not the full
+    # vectors, which stay on disk for rebuilds) plus the BM25 postings
+    lexical_path = os.path.join(store_path, BM25Index.FILE_NAME)
+    return snapshot.nbytes + (os.path.getsize(lexical_path) if os.path.exists(lexical_path) else 0)
+
+
+def build_lexical(snapshot):
+    # BM25 over the chunks of a snapshot; needs no embedding calls
+    return BM25Index.build(snapshot.items())
+
+
+def load_store(store_path):
+    # Map a shard through the registry so it is only opened once.
+    # Directories in the old pickle format are skipped until warm-up re-ingests them.
+    def loader():
+        snapshot = SnapshotStore.open(store_path)
+        if snapshot is None:
+            return None, 0
+        lexical = BM25Index.load(store_path) or build_lexical(snapshot)
+        return Shard(snapshot, lexical), shard_size(store_path, snapshot)
+
+    return store_registry.get(store_path, loader)
+
+
+# Thread pool used to search several shards concurrently
+search_pool = ThreadPoolExecutor(max_workers=int(os.getenv("SEARCH_WORKERS", "8")))
+
+# Retrieval mode: vector, hybrid (vector + BM25 fused by rank) or lexical_first
+# (BM25 alone when it is confident, skipping the query-embedding round trip)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# Fraction of the query's content words the best BM25 hit must contain to skip embedding
+LEXICAL_CONFIDENCE = float(os.getenv("LEXICAL_CONFIDENCE", "0.75"))
+
+
+def list_shards():
+    # One shard per uploaded PDF
+    return [store_path_for(f) for f in sorted(os.listdir(UPLOAD_FOLDER)) if f.endswith('.pdf')]
+
+
+def load_shards(pdf_name=""):
+    store_paths = [store_path_for(pdf_name)] if pdf_name else list_shards()
+    with metrics.timed(stage_seconds, "load_store"):
+        return [(path, shard) for path, shard in zip(store_paths, search_pool.map(load_store, store_paths)) if shard]
+
+
+def lexical_confident(query, pdf_name=""):
+    # True when some chunk contains at least LEXICAL_CONFIDENCE of the query terms
+    best = 0.0
+    shards = load_shards(pdf_name)
+    with metrics.timed(stage_seconds, "lexical_probe"):
+        for _, shard in shards:
+            hits = shard.lexical.search(query, k=1)
+            if hits:
+                best = max(best, hits[0][2])
+    return best >= LEXICAL_CONFIDENCE
+
+
+def search_shards(query, query_vector, pdf_name="", k=5):
+    # Search one shard, or fan out over all of them and merge the top-k.
+    # Without a query vector only the BM25 index is used.
+    shards = load_shards(pdf_name)
+    if not shards:
+        return None
+
+    # The query is embedded once by the caller and reused for every shard
+    def search(item):
+        path, shard = item
+        vector_hits, lexical_hits = [], []
+        if query_vector is not None:
+            vector_hits = shard.vectors.search(query_vector, k=k)
+        if RETRIEVAL_MODE != "vector" or query_vector is None:
+            lexical_hits = [(shard.document(chunk_id), score) for chunk_id, score, _ in shard.lexical.search(query, k)]
+        return path, vector_hits, lexical_hits
+
+    with metrics.timed(stage_seconds, "search"):
+        results = list(search_pool.map(search, shards))
+
+    docs_by_key, vector_ranked, lexical_rankings = {}, [], []
+    for path, vector_hits, lexical_hits in results:
+        for doc, distance in vector_hits:
+            docs_by_key[(path, doc.page_content)] = doc
+            vector_ranked.append((distance, (path, doc.page_content)))
+        for doc, _ in lexical_hits:
+            docs_by_key[(path, doc.page_content)] = doc
+        lexical_rankings.append([((path, doc.page_content), score) for doc, score in lexical_hits])
+
+    # Vector hits are squared L2 distances from one model, comparable across shards (lower is
+    # closer); BM25 scores are not, so each shard's lexical hits are merged by rank
+    vector_ranked.sort(key=lambda pair: pair[0])
+    fused = reciprocal_rank_fusion([[key for _, key in vector_ranked], merge_by_rank(lexical_rankings)])
+    return [docs_by_key[key] for key in fused[:k]]
+
+
+def embed_query(query):
+    # Query embedding, or None when lexical retrieval can stand in for a failed call
+    try:
+        with metrics.timed(stage_seconds, "embed"):
+            return query_embeddings.embed_query(query)
+    except UpstreamBusy:
+        raise
+    except Exception as e:
+        if RETRIEVAL_MODE == "vector":
+            raise
+        print("Query embedding failed, using lexical retrieval only:", e)
+        return None
+
+
+# Answers to near-duplicate questions are served from memory
+answer_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+    ttl=int(os.getenv("ANSWER_CACHE_TTL", "3600")),
+    max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000")),
+)
+
+
+def cache_scope(pdf_name):
+    # Answers are cached per document, or under "*" when all shards were searched
+    return os.path.basename(pdf_name) if pdf_name else "*"
+
+
+# Structured timetables parsed from schedule PDFs, one JSON file per document
+TIMETABLE_FOLDER = "timetables"
+timetable_cache = {}  # path -> (TimetableIndex, prompt text)
+timetable_cache_lock = threading.Lock()
+
+
+def timetable_path_for(pdf_name):
+    store_name = os.path.basename(pdf_name).replace('.pdf', '')
+    return os.path.join(TIMETABLE_FOLDER, f"{store_name}.json")
+
+
+def load_timetable_index(path):
+    with timetable_cache_lock:
+        if path in timetable_cache:
+            return timetable_cache[path]
+    table = load_timetable(path)
+    entry = (TimetableIndex(table["events"]), format_timetable(table["events"])) if table else None
+    with timetable_cache_lock:
+        timetable_cache[path] = entry
+    return entry
+
+
+def get_timetable(pdf_name=""):
+    # Timetable index and prompt text for the selected document, or all documents
+    pdf_names = [pdf_name] if pdf_name else [f for f in sorted(os.listdir(UPLOAD_FOLDER)) if f.endswith('.pdf')]
+    entries = [entry for entry in (load_timetable_index(timetable_path_for(name)) for name in pdf_names) if entry]
+    if not entries:
+        return None, ""
+    if len(entries) == 1:
+        return entries[0]
+    events = [event for index, _ in entries for event in index.events]
+    return TimetableIndex(events), "\n".join(text for _, text in entries)
+
+
+def invalidate_timetable(pdf_name):
+    with timetable_cache_lock:
+        timetable_cache.pop(timetable_path_for(pdf_name), None)
+
+
+# Answers to common questions, generated per document at ingest time and versioned by its content hash.
+# The questions come from faq_questions.json: "*" for every document, or keyed by PDF name.
+FAQ_FOLDER = "faqs"
+FAQ_QUESTIONS_PATH = os.getenv("FAQ_QUESTIONS_PATH", "faq_questions.json")
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.5"))
+faq_pool = ThreadPoolExecutor(max_workers=int(os.getenv("FAQ_WORKERS", "4")))
+faq_cache = {}  # path -> FaqIndex
+faq_cache_lock = threading.Lock()
+# Held while answers are saved and while a PDF is deleted, so a refresh never writes back a deleted document's answers
+faq_write_lock = threading.Lock()
+
+
+def faq_path_for(pdf_name):
+    store_name = os.path.basename(pdf_name).replace('.pdf', '')
+    return os.path.join(FAQ_FOLDER, f"{store_name}.json")
+
+
+def load_faq_index(path):
+    with faq_cache_lock:
+        if path in faq_cache:
+            return faq_cache[path]
+    faq = load_faq(path)
+    entry = FaqIndex(faq["entries"], FAQ_MATCH_THRESHOLD) if faq and faq["entries"] else None
+    with faq_cache_lock:
+        faq_cache[path] = entry
+    return entry
+
+
+def get_faq(pdf_name=""):
+    # FAQ index for the selected document, or all documents
+    pdf_names = [pdf_name] if pdf_name else [f for f in sorted(os.listdir(UPLOAD_FOLDER)) if f.endswith('.pdf')]
+    indexes = [index for index in (load_faq_index(faq_path_for(name)) for name in pdf_names) if index]
+    if len(indexes) <= 1:
+        return indexes[0] if indexes else None
+    return FaqIndex([entry for index in indexes for entry in index.entries], FAQ_MATCH_THRESHOLD)
+
+
+def invalidate_faq(pdf_name):
+    with faq_cache_lock:
+        faq_cache.pop(faq_path_for(pdf_name), None)
+
+
+def match_faq(question, pdf_name=""):
+    with metrics.timed(stage_seconds, "faq"):
+        index = get_faq(pdf_name)
+        entry = index.match(question) if index else None
+    return entry["answer"] if entry else None
+
+
+# On-disk embedding cache, so unchanged chunks are never embedded twice
+embedding_cache = EmbeddingCache(os.path.join("embedding_cache", "embeddings.sqlite3"), embedding_model_name(EMBEDDING_MODEL))
+
+
+# Background ingestion: parallel page extraction and a job queue for /upload
+page_extractor = PageExtractor(workers=int(os.getenv("EXTRACT_WORKERS", "4")))
+ingestion_queue = IngestionQueue(workers=int(os.getenv("INGEST_WORKERS", "2")))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+# Vector index type for new stores (flat, float16, ivf, pq, ivfpq) and its parameters as JSON,
+# e.g. INDEX_PARAMS='{"nlist": 256, "nprobe": 16}'. Existing stores keep their type when re-ingested.
+INDEX_TYPE = os.getenv("INDEX_TYPE", "flat")
+INDEX_PARAMS = json.loads(os.getenv("INDEX_PARAMS", "{}"))
+if INDEX_TYPE not in INDEX_TYPES:
+    raise ValueError(f"INDEX_TYPE must be one of {', '.join(INDEX_TYPES)}")
+
+# One ingestion at a time per shard
+store_locks = {}
+store_locks_guard = threading.Lock()
+# Bumped by /delete_pdf, so an upload queued before the delete is dropped instead of restoring the PDF
+deletions = {}  # pdf_name -> number of deletes
+
+
+def store_lock(store_path):
+    with store_locks_guard:
+        return store_locks.setdefault(store_path, threading.Lock())
+
+
+def deletion_count(pdf_name):
+    with store_locks_guard:
+        return deletions.get(pdf_name, 0)
+
+
+def save_store_atomically(snapshot, lexical, store_path):
+    # Write to a sibling directory and swap it in, so readers never see a half-written index.
+    # snapshot: keyword arguments for write_snapshot
+    tmp_path = temporary_path(store_path)
+    write_snapshot(tmp_path, **snapshot)
+    lexical.save(tmp_path)
+    swap_directory(tmp_path, store_path)
+
+
 # Preprocess PDF and store vectors
-def process_pdf(PDF_PATH, STORE_PATH):
-    if os.path.exists(PDF_PATH):
+def process_pdf(PDF_PATH, STORE_PATH, job=None, index_type=None):
+    # Incrementally (re)build a shard: only new or changed chunks are embedded.
+    # The previous index keeps serving until the new one is swapped in.
+    if not os.path.exists(PDF_PATH):
+        return None
+
+    with store_lock(STORE_PATH):
+        # The PDF may have been deleted while this job waited for the lock
+        if not os.path.exists(PDF_PATH):
+            return None
+        # An unchanged PDF whose snapshot was built with the current model needs no work
+        source_hash = file_hash(PDF_PATH)
+        existing = SnapshotStore.open(STORE_PATH)
+        if index_type is not None:
+            index_params = INDEX_PARAMS
+        elif existing:
+            index_type, index_params = existing.index_type, existing.index_params
+        else:
+            index_type, index_params = INDEX_TYPE, INDEX_PARAMS
+        if existing and existing.is_current(embedding_model_name(EMBEDDING_MODEL), source_hash, index_type):
+            return {"chunks": len(existing.ids), "unchanged": len(existing.ids), "removed": 0,
+                    "reused": 0, "embedded": 0, "events": None, "skipped": True}
+
+        if job:
+            job.update(stage="extracting")
+        started = time.perf_counter()
+        with metrics.timed(ingest_stage_seconds, "extract"):
+            pages = page_extractor.extract(
+                PDF_PATH, progress=(lambda done, total: job.update(pages_extracted=done, pages_total=total)) if job else None)
+        ingest_pages.inc(len(pages))
+        ingest_pages_per_second.observe(len(pages) / max(time.perf_counter() - started, 1e-6))
+        text = " ".join(page for page in pages if page)
 
-        pdf_reader = PdfReader(PDF_PATH)
-        text = " ".join([page.extract_text().replace("\n", " ") for page in pdf_reader.pages if page.extract_text()])
+        # Parse the schedule into a structured event table for the fast path; a table from an
+        # older version of this PDF is replaced, or dropped when no events are found
+        events = parse_timetable(text)
+        if save_timetable(timetable_path_for(PDF_PATH), events, source_hash):
+            invalidate_timetable(PDF_PATH)
 
         # split text
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        chunks = text_splitter.split_text(text.strip())
+        if job:
+            job.update(stage="splitting")
+        with metrics.timed(ingest_stage_seconds, "split"):
+            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+            chunks = text_splitter.split_text(text.strip())
 
-        # Generate Embedding
-        embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=gemini_api_key)
+        # Chunks are identified by content hash, so identical chunks are stored once
+        texts_by_hash = {}
+        for chunk in chunks:
+            texts_by_hash.setdefault(chunk_hash(chunk), chunk)
 
-        # Processing vector storage
-        if os.path.exists(STORE_PATH):
-            vector_store = FAISS.load_local(STORE_PATH, embeddings, allow_dangerous_deserialization=True)
-        else:
-            vector_store = FAISS.from_texts(chunks, embedding=embeddings)
-            vector_store.save_local(STORE_PATH)
+        if not texts_by_hash:
+            return None
+
+        # Snapshots from another embedding model cannot be reused
+        if existing and existing.manifest.get("model") != embedding_model_name(EMBEDDING_MODEL):
+            existing = None
+        existing_ids = set(existing.ids) if existing else set()
+
+        added = [h for h in texts_by_hash if h not in existing_ids]
+        removed = [h for h in existing_ids if h not in texts_by_hash]
+        if job:
+            job.update(stage="embedding", chunks_total=len(texts_by_hash),
+                       chunks_embedded=len(texts_by_hash) - len(added))
+        with metrics.timed(ingest_stage_seconds, "embed_chunks"):
+            vectors, reused, embedded = embed_with_cache(
+                embedding_cache, bulk_embeddings, {h: texts_by_hash[h] for h in added}, batch_size=EMBED_BATCH_SIZE,
+                progress=(lambda done, _: job.update(chunks_embedded=len(texts_by_hash) - len(added) + done)) if job else None)
+
+        # Build the new snapshot in document order; unchanged rows are copied from the old one
+        if job:
+            job.update(stage="indexing")
+        source = os.path.basename(PDF_PATH)
+        ids = list(texts_by_hash)
+        with metrics.timed(ingest_stage_seconds, "index"):
+            snapshot = {
+                "ids": ids,
+                "vectors": [vectors[h] if h in vectors else existing.vector(h) for h in ids],
+                "texts": [texts_by_hash[h] for h in ids],
+                "metadatas": [{"source": source, "chunk_hash": h} for h in ids],
+                "model": embedding_model_name(EMBEDDING_MODEL),
+                "source_hash": source_hash,
+                "index_type": index_type,
+                "index_params": index_params,
+            }
+            # The BM25 index is rebuilt from the chunks alongside the vectors
+            lexical = BM25Index.build(zip(ids, snapshot["texts"]))
+        with metrics.timed(ingest_stage_seconds, "save"):
+            save_store_atomically(snapshot, lexical, STORE_PATH)
+
+        # Swap the new index in for queries
+        stored = SnapshotStore.open(STORE_PATH)
+        store_registry.put(STORE_PATH, Shard(stored, lexical), shard_size(STORE_PATH, stored))
+        ingest_chunks.inc(len(texts_by_hash) - len(added), "unchanged")
+        ingest_chunks.inc(embedded, "embedded")
+        ingest_chunks.inc(reused, "reused")
+        ingest_chunks.inc(len(removed), "removed")
+        ingest_chunks_per_second.observe(len(texts_by_hash) / max(time.perf_counter() - started, 1e-6))
+        return {
+            "chunks": len(texts_by_hash),
+            "unchanged": len(texts_by_hash) - len(added),
+            "removed": len(removed),
+            "reused": reused,
+            "embedded": embedded,
+            "events": len(events),
+        }
+
+
+def generate_faq_answer(pdf_name, question, query_vector):
+    # The grounded pipeline at bulk priority, without the answer cache or a conversation.
+    # Only grounded answers are served from the FAQ store; a question the document does not
+    # answer is recorded without one, so it goes to live chat and is not retried for this version.
+    try:
+        timetable_index, timetable_text = get_timetable(pdf_name)
+        answer = timetable_index.answer(question) if timetable_index else None
+        if not answer:
+            docs = search_shards(question, query_vector, pdf_name, k=CONTEXT_CANDIDATES)
+            if not docs:
+                return None
+            docs, timetable_text, _ = pack_context(question, docs, timetable_text)
+            answer = run_chain(docs, build_prompt(question, timetable_text), BULK)
+            if is_negative(answer):
+                answer = None
+        return {"question": question, "answer": answer, "source": pdf_name}
+    except Exception as e:
+        print(f"FAQ answer for {question!r} failed:", e)
+        return None
+
+
+def refresh_faq(pdf_path, job=None):
+    # (Re)generate the answers of a document whose content, question list or model changed.
+    # Answers still valid for this version are kept, so only new or failed questions are generated.
+    pdf_name = os.path.basename(pdf_path)
+    path = faq_path_for(pdf_name)
+    questions = questions_for(load_questions(FAQ_QUESTIONS_PATH), pdf_name)
+    if not questions or not os.path.exists(pdf_path):
+        if os.path.exists(path):
+            os.remove(path)
+            invalidate_faq(pdf_name)
+        return {"questions": 0, "generated": 0}
+
+    source_hash = file_hash(pdf_path)
+    existing = load_faq(path)
+    answers = reusable_answers(existing, source_hash, LLM_MODEL)
+    pending = [question for question in questions if question not in answers]
+    if not pending and len(answers) == len(questions):
+        return {"questions": len(questions), "generated": 0, "skipped": True}
+    if existing and not answers:
+        # Answers for the old content are withdrawn at once; /chat uses live retrieval until regenerated
+        os.remove(path)
+        invalidate_faq(pdf_name)
+
+    if job:
+        job.update(stage="faq", faq_total=len(questions), faq_answered=len(questions) - len(pending))
+    with metrics.timed(ingest_stage_seconds, "faq"):
+        # One embedding batch for all pending questions, then answers concurrently within the upstream limits
+        try:
+            vectors = bulk_embeddings.embed_documents(pending)
+        except Exception as e:
+            print("FAQ question embedding failed, using lexical retrieval only:", e)
+            vectors = [None] * len(pending)
+        generated = [entry for entry in faq_pool.map(
+            lambda pair: generate_faq_answer(pdf_name, *pair), zip(pending, vectors)) if entry]
+    answers.update((entry["question"], entry) for entry in generated)
+    with faq_write_lock:
+        # The PDF may have been deleted or replaced while its answers were generated
+        if not os.path.exists(pdf_path) or file_hash(pdf_path) != source_hash:
+            return {"questions": len(questions), "generated": 0, "stale": True}
+        save_faq(path, pdf_name, source_hash, LLM_MODEL, [answers[q] for q in questions if q in answers])
+        invalidate_faq(pdf_name)
+    if job:
+        job.update(faq_answered=len(questions) - len(pending) + len(generated))
+    return {"questions": len(questions), "generated": len(generated), "failed": len(pending) - len(generated),
+            "unanswered": sum(1 for entry in generated if not entry["answer"])}
+
+# Start-up work runs in the background so the server accepts connections at once:
+# PDFs whose snapshot is missing, stale or in the old pickle format are re-ingested.
+# Existing snapshots, even stale ones, keep serving while they are rebuilt, so the server is
+# ready as soon as they are mapped; only a document with no snapshot at all is answered
+# with a 503 and Retry-After until its first snapshot is built.
+warm_up_jobs = []
+unbuilt = {}  # pdf_name -> start-up job building the document's first snapshot
+warmed_up = threading.Event()
+WARM_UP_RETRY_AFTER = 5
 
-        return vector_store
-    return None
 
-vector_store = process_pdf(PDF_PATH, STORE_PATH)
+def warm_up():
+    try:
+        model = embedding_model_name(EMBEDDING_MODEL)
+        for pdf_name in sorted(os.listdir(UPLOAD_FOLDER)):
+            if not pdf_name.endswith(".pdf"):
+                continue
+            pdf_path = os.path.join(UPLOAD_FOLDER, pdf_name)
+            store_path = store_path_for(pdf_name)
+            snapshot = SnapshotStore.open(store_path)
+            if snapshot is None or not snapshot.is_current(model, file_hash(pdf_path)):
+                job = ingestion_queue.submit(
+                    pdf_name, lambda job, pdf_path=pdf_path, store_path=store_path: process_pdf(pdf_path, store_path, job))
+                warm_up_jobs.append(job)
+                if snapshot is None:
+                    unbuilt[pdf_name] = job
+        for store_path in list_shards():
+            load_store(store_path)
+    finally:
+        # A failed start-up must not leave chat refusing requests forever
+        warmed_up.set()
+
+    # Stale FAQ answers are regenerated once the indexes are rebuilt, at bulk priority
+    for job in warm_up_jobs:
+        job.wait()
+    for pdf_name in sorted(os.listdir(UPLOAD_FOLDER)):
+        if pdf_name.endswith(".pdf"):
+            pdf_path = os.path.join(UPLOAD_FOLDER, pdf_name)
+            ingestion_queue.submit(pdf_name, lambda job, pdf_path=pdf_path: refresh_faq(pdf_path, job))
+
+
+def building():
+    # Documents whose first snapshot is still being built at start-up
+    return sorted(pdf_name for pdf_name, job in unbuilt.items() if not job.wait(0))
+
+
+def waiting_for_index(pdf_name):
+    # True when a chat request has no snapshot to search yet: its document is still being built,
+    # or, across all documents, none of them has a snapshot
+    if not warmed_up.is_set():
+        return True
+    pending = building()
+    if not pending:
+        return False
+    if pdf_name:
+        return os.path.basename(pdf_name) in pending
+    return set(pending) >= {f for f in os.listdir(UPLOAD_FOLDER) if f.endswith('.pdf')}
+
 
 @app.route("/upload", methods=["POST"])
 def upload_pdf():
-    # Allows users to upload PDFs and create vector stores 
+    # Allows users to upload PDFs; the vector store is built by a background job
     if "file" not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
 
@@ -63,89 +656,774 @@ def upload_pdf():
     if file.filename == "":
         return jsonify({"error": "Empty filename"}), 400
 
-    pdf_path = os.path.join(UPLOAD_FOLDER, file.filename)
-    store_path = os.path.join("vector_stores", "orientation")
+    pdf_name = os.path.basename(file.filename)
+    pdf_path = os.path.join(UPLOAD_FOLDER, pdf_name)
+    store_path = store_path_for(pdf_name)
 
+    # Optional vector index type for this document's store
+    index_type = request.form.get("index_type") or None
+    if index_type and index_type not in INDEX_TYPES:
+        return jsonify({"error": f"index_type must be one of {', '.join(INDEX_TYPES)}"}), 400
 
-    file.save(pdf_path)
-    vector_store = process_pdf(pdf_path, store_path)
-    
-    return jsonify({"message": f"PDF {file.filename} uploaded and processed successfully!"})
+    # Save under a temporary name so a running ingestion never reads a partial file
+    tmp_path = os.path.join(UPLOAD_FOLDER, f".{uuid.uuid4().hex}.upload")
+    file.save(tmp_path)
+    deleted = deletion_count(pdf_name)
 
-@app.route("/chat", methods=["POST"])
-def chat():
-    # Handling Chat Enquiry
-    data = request.json
-    query = data.get("message", "")
-    pdf_name = data.get("pdf_name", "") # Users can choose between different PDF
+    def run(job):
+        with store_lock(store_path):
+            # Deleted after this upload was queued: the delete wins
+            if deletion_count(pdf_name) != deleted:
+                os.remove(tmp_path)
+                return None
+            os.replace(tmp_path, pdf_path)
+        report = process_pdf(pdf_path, store_path, job, index_type)
+        answer_cache.invalidate(cache_scope(pdf_name))
+        # Only this document's FAQ answers are regenerated, and only if its content changed
+        if report:
+            report["faq"] = refresh_faq(pdf_path, job)
+        return report
+
+    job = ingestion_queue.submit(pdf_name, run)
+    return jsonify({"message": f"PDF {pdf_name} uploaded, processing in the background.", "job_id": job.id}), 202
+
+
+def start_warm_up():
+    if os.getenv("WARM_UP", "1") == "1":
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    else:
+        warmed_up.set()
+
+
+@app.before_request
+def require_warm_up():
+    # Chat needs an index to search: answer with a 503 while its document has none yet
+    if request.endpoint not in ("chat", "chat_stream"):
+        return None
+    if waiting_for_index((request.get_json(silent=True) or {}).get("pdf_name", "")):
+        response = jsonify({"response": "Error: The assistant is still starting up, please try again shortly.",
+                            "retry_after": WARM_UP_RETRY_AFTER})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(WARM_UP_RETRY_AFTER)
+        return response
 
-    if not query:
-        return jsonify({"response": "Error: Empty query!"})
 
-    store_path = os.path.join("vector_stores", "orientation")
-    
-    if not os.path.exists(store_path):
-        return jsonify({"response": f"Error: Vector store for {pdf_name} not found!"})
+@app.route("/ready", methods=["GET"])
+def ready():
+    # Readiness probe: 503 until the existing snapshots are mapped. Stale ones are rebuilt in
+    # the background; "building" lists documents that cannot be searched until their job ends.
+    body = {
+        "ready": warmed_up.is_set(),
+        "pending_jobs": [job.id for job in warm_up_jobs if not job.wait(0)],
+        "building": building(),
+        "stores_loaded": len(store_registry.keys()),
+    }
+    return jsonify(body), 200 if body["ready"] else 503
 
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=gemini_api_key)
-    vector_store = FAISS.load_local(store_path, embeddings, allow_dangerous_deserialization=True)
 
-    docs = vector_store.similarity_search(query=query, k=5)
+@app.route("/ingest_status/<job_id>", methods=["GET"])
+def ingest_status(job_id):
+    # Per-stage progress of an ingestion job started by /upload
+    job = ingestion_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    return jsonify(job.snapshot())
 
-        # Setting the Prompt
+
+# Shared Gemini client and "stuff" QA chain
+llm = make_llm(LLM_MODEL, gemini_api_key, temperature=0.2)  # Adjust temperature
+chain = load_qa_chain(llm=llm, chain_type="stuff")
+
+# Phrases that mark a grounded answer as unsatisfactory
+negative_indicators = [
+    "not contain information",
+    "the text only mentions",
+    "no relevant information",
+    "unable to answer",
+    "not found",
+    "does not provide",
+    "don't know "
+]
+
+
+def build_prompt(query, timetable_text="", history=""):
+    # Setting the Prompt
     prompt = (
             f"You are a James Cook University  Koalion and you are here to help Q&A regarding orientation information for new students. if no information found to answer, refer "
             f"Based on the given information and text, answer the question: '{query}' in detail."
             f"Example 1: Question: Where is the Explore Booth?; Response: The Explore Booth is in Block E"
             f"Example 2: Question: What is the venue of Network with Lecturers and Peers?; Response: The Network with Lecturers and Peers is in Multi-Purpose Hall"
-            f"""Detail orientation timetable information:
-            09:00 AM - 09:05 AM : Welcome Speech by Deputy Vice-Chancellor, Singapore; Welcome Speech by Acting Campus Dean & Head of Learning, Teaching and Student Engagement - Venue: Block C
-            09:05 AM - 09:10 AM : JCU 101 - Venue: Block C
-            09:10 AM to 10:25 AM : DigiLearn Workshop & Academic Advising - Venue: Block C
-            10:40 AM - 11:40 AM : Diploma and Bachelor of Business Programs - Venue: Block C
-            10:40 AM - 11:40 AM : Postgraduate Business and Postgraduate Qualifying; Programs - Business - Venue: Block C
-            10:40 AM - 11:40 AM : Bachelor of Environmental Science Programs - Venue: Block C
-            10:40 AM - 11:40 AM : Diploma and Bachelor of Arts and Psychological Science Programs - Venue: Block C
-            10:40 AM - 11:40 AM : Master of Psychological Science, Graduate Diploma of Psychology and Graduate Certificate of Psychological Science Programs - Venue: Block C
-            10:40 AM - 11:40 AM : Diploma, Bachelor, and Master of Information Technology and Science Programs - Venue: Block C
-            10:40 AM - 11:40 AM : Pre-University Foundation Programs - Venue: Block C
-            10:40 AM - 11:40 AM : Introduction to ELPP - Venue: Block C
-            01:30 PM to 03:00 PM : Explore Booths - Venue: Block E
-            03:00 PM to 05:00 PM : Network with Lecturers and Peers - Venue: Multipurpose Hall
-            """
                     )
-                
-    llm = GoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.2, google_api_key=gemini_api_key)  # Adjust temperature
-    chain = load_qa_chain(llm=llm, chain_type="stuff")
-
-    if docs:
-        response = chain.run(input_documents=docs, question=prompt)
-
-        # Check if the response indicates a negative result
-        negative_indicators = [
-            "not contain information",
-            "the text only mentions",
-            "no relevant information",
-            "unable to answer",
-            "not found",
-            "does not provide",
-            "don't know "
-        ]
-
-
-        if not response or any(indicator in response.lower() for indicator in negative_indicators):
-        # If the response is not satisfactory, use Gemini AI for a more general answer
-            prompt = (
-                    f"You are a James Cook University Koalion. Answer the following question based on general knowledge: '{query}'. "
-                    "If you cannot find specific information, provide a helpful response."
-                )
-            response = llm.invoke(prompt)
-    else:
-        response = llm.invoke(prompt)
+    # The timetable comes from the parsed table of the selected document(s)
+    if timetable_text:
+        prompt += f"Detail orientation timetable information:\n{timetable_text}\n"
+    # Earlier turns of this student's session (summary + recent turns, bounded in tokens)
+    if history:
+        prompt += f"Conversation so far:\n{history}\n"
+    return prompt
+
+
+def build_condense_prompt(history, query):
+    # Rewrites a follow-up into a question that retrieval can handle on its own
+    return (
+            "Given the conversation below, rewrite the student's follow-up question as a single standalone "
+            "question that can be understood without the conversation. Reply with the question only.\n\n"
+            f"Conversation:\n{history}\n\nFollow-up question: {query}\nStandalone question:"
+        )
+
+
+def build_summary_prompt(summary, turns):
+    return (
+            "Summarise this conversation between a new student and the James Cook University orientation "
+            f"assistant in at most {HISTORY_TOKEN_BUDGET // 4} words. Keep names, places, times and anything the "
+            "student still wants to know.\n\n"
+            f"Summary so far:\n{summary or '(none)'}\n\n"
+            "New turns:\n" + "\n".join(format_turn(standalone, answer) for _, standalone, answer in turns) +
+            "\n\nUpdated summary:"
+        )
+
+
+def build_fallback_prompt(query):
+    # General-knowledge prompt used when the documents do not answer the question
+    return (
+            f"You are a James Cook University Koalion. Answer the following question based on general knowledge: '{query}'. "
+            "If you cannot find specific information, provide a helpful response."
+        )
+
+
+def is_negative(response):
+    return not response or any(indicator in response.lower() for indicator in negative_indicators)
+
+
+def count_tokens(prompt, response):
+    llm_tokens.inc(estimate_tokens(prompt), "prompt")
+    llm_tokens.inc(estimate_tokens(response), "completion")
+    # Prompt tokens are reserved at admission; the completion is charged once it is known
+    upstream.charge(LLM_MODEL, estimate_tokens(response))
+
+
+def run_chain(docs, question, priority=INTERACTIVE):
+    # Grounded generation, timed and token-counted
+    prompt = stuff_prompt(docs, question)
+    with metrics.timed(stage_seconds, "generate"):
+        response = upstream.call(LLM_MODEL, lambda: chain.run(input_documents=docs, question=question),
+                                 estimate_tokens(prompt), priority, deadline_for(priority))
+    count_tokens(prompt, response)
+    return response
 
+
+def invoke_llm(prompt, stage="generate", priority=INTERACTIVE, deadline=None):
+    # deadline: latest admission time, by default the one for the priority
+    with metrics.timed(stage_seconds, stage):
+        response = upstream.call(LLM_MODEL, lambda: llm.invoke(prompt), estimate_tokens(prompt), priority,
+                                 deadline or deadline_for(priority))
+    count_tokens(prompt, response)
+    return response
+
+
+def stream_llm(prompt):
+    # Admission happens before the first token; the slot is held until the stream ends
+    return upstream.stream(LLM_MODEL, lambda: llm.stream(prompt), estimate_tokens(prompt), INTERACTIVE,
+                           deadline_for(INTERACTIVE))
+
+
+async def run_chain_async(docs, question):
+    prompt = stuff_prompt(docs, question)
+    with metrics.timed(stage_seconds, "generate"):
+        response = await chat_service.upstream(upstream.acall(
+            LLM_MODEL, lambda: chain.arun(input_documents=docs, question=question), estimate_tokens(prompt),
+            INTERACTIVE, deadline_for(INTERACTIVE)))
+    count_tokens(prompt, response)
+    return response
+
+
+async def invoke_llm_async(prompt, stage="generate"):
+    with metrics.timed(stage_seconds, stage):
+        response = await chat_service.upstream(upstream.acall(
+            LLM_MODEL, lambda: llm.ainvoke(prompt), estimate_tokens(prompt), INTERACTIVE, deadline_for(INTERACTIVE)))
+    count_tokens(prompt, response)
+    return response
+
+
+# How the general-knowledge fallback is run: sequential, speculative or verdict. Verdict needs a
+# single generation; speculative is opt-in, as it spends a second request on every question.
+FALLBACK_STRATEGY = os.getenv("FALLBACK_STRATEGY", VERDICT)
+if FALLBACK_STRATEGY not in STRATEGIES:
+    raise ValueError(f"FALLBACK_STRATEGY must be one of {', '.join(STRATEGIES)}")
+fallback_telemetry = FallbackTelemetry(FALLBACK_STRATEGY)
+generation_pool = ThreadPoolExecutor(max_workers=int(os.getenv("GENERATION_WORKERS", "16")))
+
+
+def generate_answer(query, docs, prompt):
+    # Grounded answer with a general-knowledge fallback, in at most one generation of latency
+    if not docs:
+        return invoke_llm(prompt)
+
+    if FALLBACK_STRATEGY == VERDICT:
+        answered, response = parse_verdict(run_chain(docs, prompt + VERDICT_INSTRUCTIONS))
+        fallback_telemetry.record(not answered)
+        return response
+
+    if FALLBACK_STRATEGY == SPECULATIVE:
+        response, fell_back, discarded = run_speculative(
+            generation_pool,
+            in_context(lambda: run_chain(docs, prompt)),
+            in_context(lambda: invoke_llm(build_fallback_prompt(query), "fallback")),
+            is_negative,
+        )
+        fallback_telemetry.record(fell_back, discarded)
+        return response
+
+    response = run_chain(docs, prompt)
+    # If the response is not satisfactory, use Gemini AI for a more general answer
+    fell_back = is_negative(response)
+    if fell_back:
+        response = invoke_llm(build_fallback_prompt(query), "fallback")
+    fallback_telemetry.record(fell_back)
+    return response
+
+
+async def generate_answer_async(query, docs, prompt):
+    if not docs:
+        return await invoke_llm_async(prompt)
+
+    if FALLBACK_STRATEGY == VERDICT:
+        response = await run_chain_async(docs, prompt + VERDICT_INSTRUCTIONS)
+        answered, response = parse_verdict(response)
+        fallback_telemetry.record(not answered)
+        return response
+
+    if FALLBACK_STRATEGY == SPECULATIVE:
+        response, fell_back, discarded = await run_speculative_async(
+            run_chain_async(docs, prompt),
+            invoke_llm_async(build_fallback_prompt(query), "fallback"),
+            is_negative,
+        )
+        fallback_telemetry.record(fell_back, discarded)
+        return response
+
+    response = await run_chain_async(docs, prompt)
+    fell_back = is_negative(response)
+    if fell_back:
+        response = await invoke_llm_async(build_fallback_prompt(query), "fallback")
+    fallback_telemetry.record(fell_back)
+    return response
+
+
+def stuff_prompt(docs, prompt):
+    # The full prompt the "stuff" chain would send, so it can be streamed directly
+    context = "\n\n".join(doc.page_content for doc in docs)
+    return chain.llm_chain.prompt.format(context=context, question=prompt)
+
+
+# Retrieved chunks are merged, de-duplicated and packed into a token budget before prompting
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "5"))
+context_packer = ContextPacker(
+    budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500")),
+    mmr=os.getenv("CONTEXT_MMR", "0") == "1",
+    mmr_lambda=float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7")),
+)
+context_tokens_saved = metrics.counter(
+    "chatbot_context_tokens_saved_total", "Estimated prompt tokens removed by context packing")
+
+
+def pack_context(query, docs, timetable_text):
+    with metrics.timed(stage_seconds, "pack"):
+        docs, timetable_text, report = context_packer.pack(query, docs, timetable_text)
+    context_tokens_saved.inc(report["tokens_saved"])
+    return docs, timetable_text, report
+
+
+# Server-side chat sessions keyed by the client's session_id. Older turns are rolled into
+# a running summary so the history sent to the model stays under HISTORY_TOKEN_BUDGET.
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "600"))
+conversations = ConversationStore(
+    ttl=int(os.getenv("SESSION_TTL_SECONDS", "3600")),
+    max_sessions=int(os.getenv("MAX_SESSIONS", "1000")),
+    history_tokens=HISTORY_TOKEN_BUDGET,
+    recent_turns=int(os.getenv("HISTORY_RECENT_TURNS", "4")),
+)
+# Summaries run on their own small pool, so a backlog of them never holds the workers that
+# chat fallbacks and /faq use, and give up when not admitted in time (the turns are kept)
+summary_pool = ThreadPoolExecutor(max_workers=int(os.getenv("SUMMARY_WORKERS", "2")))
+SUMMARY_DEADLINE_SECONDS = float(os.getenv("SUMMARY_DEADLINE_SECONDS", "60"))
+
+
+def get_conversation(data):
+    session_id = data.get("session_id")
+    return conversations.get(str(session_id)) if session_id else None
+
+
+def is_follow_up(conversation, question):
+    # Only questions that point back at earlier turns depend on the conversation
+    return conversation is not None and bool(conversation.version) and needs_condensing(question)
+
+
+def standalone_question(conversation, question):
+    # A follow-up is condensed into a standalone question once per turn; the result
+    # drives the timetable lookup and retrieval
+    if not is_follow_up(conversation, question):
+        return question
+    cached = conversations.standalone(conversation, question)
+    if cached:
+        conversations.record("condense_hits")
+        return cached
+    version = conversation.version
+    standalone = invoke_llm(build_condense_prompt(conversation.history(), question), "condense").strip() or question
+    conversations.remember_standalone(conversation, question, standalone, version)
+    conversations.record("condensed")
+    return standalone
+
+
+async def standalone_question_async(conversation, question):
+    if not is_follow_up(conversation, question):
+        return question
+    cached = conversations.standalone(conversation, question)
+    if cached:
+        conversations.record("condense_hits")
+        return cached
+    version = conversation.version
+    standalone = (await invoke_llm_async(build_condense_prompt(conversation.history(), question), "condense")).strip()
+    standalone = standalone or question
+    conversations.remember_standalone(conversation, question, standalone, version)
+    conversations.record("condensed")
+    return standalone
+
+
+def remember_turn(conversation, question, query, response):
+    # Record the answered turn and, when the history has grown, summarise older turns off the request path
+    if conversation is None or not response:
+        return
+    conversation.add_turn(question, query, response)
+    turns = conversation.turns_to_fold()
+    if turns:
+        summary_pool.submit(summarise_conversation, conversation, turns)
+
+
+def summarise_conversation(conversation, turns):
+    summary = None
+    try:
+        summary = invoke_llm(build_summary_prompt(conversation.summary, turns), "summarise", BULK,
+                             time.monotonic() + SUMMARY_DEADLINE_SECONDS)
+        conversations.record("summaries")
+    except Exception as e:
+        print("Conversation summary failed, keeping the turns:", e)
+    finally:
+        conversation.fold(turns, summary)
+
+
+# Questions are answered in the pivot language (English) so retrieval, the answer cache and
+# conversation history are shared by every language; answers are translated once per language
+question_translations = TranslationCache(max_entries=int(os.getenv("TRANSLATION_CACHE_SIZE", "5000")))
+answer_translations = TranslationCache(max_entries=int(os.getenv("TRANSLATION_CACHE_SIZE", "5000")))
+
+
+def translation_cache_for(source, target):
+    # (cache, language key): questions are keyed by their language, answers by the target
+    if target == PIVOT_LANGUAGE:
+        return question_translations, source
+    return answer_translations, target
+
+
+def translate(text, source, target):
+    if not text or source == target:
+        return text
+    cache, language = translation_cache_for(source, target)
+    translation = cache.get(text, language)
+    if translation is not None:
+        return translation
+    # Concurrent requests for the same popular answer wait for one translation
+    with cache.key_lock(text, language):
+        translation = cache.get(text, language, count=False)
+        if translation is None:
+            translation = invoke_llm(build_translation_prompt(text, source, target), "translate").strip() or text
+            cache.put(text, language, translation)
+    return translation
+
+
+async def translate_async(text, source, target):
+    if not text or source == target:
+        return text
+    cache, language = translation_cache_for(source, target)
+
+    async def translate_text():
+        translation = await invoke_llm_async(build_translation_prompt(text, source, target), "translate")
+        return translation.strip() or text
+
+    return await cache.get_or_translate(text, language, translate_text)
+
+
+def stream_translation(text, language):
+    # Yields the answer in the student's language; a cached translation arrives as a single token
+    translation = answer_translations.get(text, language)
+    if translation is not None:
+        yield translation
+        return
+    with answer_translations.key_lock(text, language):
+        translation = answer_translations.get(text, language, count=False)
+        if translation is not None:
+            yield translation
+            return
+        prompt = build_translation_prompt(text, PIVOT_LANGUAGE, language)
+        parts = []
+        started = time.perf_counter()
+        for token in stream_llm(prompt):
+            parts.append(token)
+            yield token
+        translation = "".join(parts).strip() or text
+        metrics.record(stage_seconds, time.perf_counter() - started, "translate")
+        count_tokens(prompt, translation)
+        answer_translations.put(text, language, translation)
+
+
+def is_error(response):
+    return response.startswith("Error:")
+
+
+def answer_source(state):
+    # Metrics label for how prepare_chat resolved a question
+    for key, source in (("error", "error"), ("cached", "cache"), ("faq", "faq"), ("direct", "timetable")):
+        if key in state:
+            return source
+    return "rag"
+
+
+def prepare_chat(data):
+    # Shared front half of /chat and /chat_stream: cache lookup and retrieval
+    question = data.get("message", "")
+    pdf_name = data.get("pdf_name", "") # Users can choose between different PDF
+    language = resolve_language(data.get("language"))
+
+    if not question:
+        return {"error": "Error: Empty query!"}
+
+    # Everything below works on the pivot-language question; the request's language decides
+    # whether it needs translating. A question picked from /faq arrives in its canonical form.
+    if not data.get("faq"):
+        question = translate(question, language, PIVOT_LANGUAGE)
+
+    # Follow-ups in a session are answered for their standalone form
+    conversation = get_conversation(data)
+    query = standalone_question(conversation, question)
+    turn = {"conversation": conversation, "question": question, "query": query, "language": language}
+
+    # Common questions are answered from the answers precomputed at ingest time
+    faq = match_faq(query, pdf_name)
+    if faq:
+        return dict(turn, faq=faq)
+
+    # Simple where/when questions are answered straight from the timetable
+    with metrics.timed(stage_seconds, "timetable"):
+        timetable_index, timetable_text = get_timetable(pdf_name)
+        direct = timetable_index.answer(query) if timetable_index else None
+    if direct:
+        return dict(turn, direct=direct)
+
+    scope = cache_scope(pdf_name)
+    version = answer_cache.version(scope)
+    # Follow-ups are answered with the conversation history in the prompt, so their answers are
+    # neither served from nor added to the shared answer cache; self-contained questions use it
+    history = conversation.history() if is_follow_up(conversation, question) else ""
+
+    # Embed the query once; it keys the answer cache and drives the search.
+    # A confident lexical match skips the embedding round trip entirely.
+    query_vector = None
+    if not (RETRIEVAL_MODE == "lexical_first" and lexical_confident(query, pdf_name)):
+        query_vector = embed_query(query)
+    if query_vector is not None and not history:
+        with metrics.timed(stage_seconds, "cache_lookup"):
+            cached = answer_cache.lookup(query_vector, scope)
+        if cached is not None:
+            return dict(turn, cached=cached)
+
+    docs = search_shards(query, query_vector, pdf_name, k=CONTEXT_CANDIDATES)
+    if docs is None:
+        return {"error": f"Error: Vector store for {pdf_name} not found!"}
+    docs, timetable_text, context = pack_context(query, docs, timetable_text)
+
+    return dict(
+        turn,
+        query_vector=query_vector,
+        scope=scope,
+        version=version,
+        docs=docs,
+        timetable_text=timetable_text,
+        history=history,
+        context=context,
+    )
+
+
+# Optional asyncio serving mode for the chat path (CHAT_MODE=async)
+ASYNC_CHAT = os.getenv("CHAT_MODE", "sync") == "async"
+chat_service = AsyncChatService(max_concurrency=int(os.getenv("MAX_UPSTREAM_CONCURRENCY", "4"))) if ASYNC_CHAT else None
+
+
+async def chat_async(question, pdf_name, conversation=None, language=PIVOT_LANGUAGE, canonical=False):
+    # Answer in the pivot language, translating the question in and the answer out.
+    # canonical: the question was picked from /faq and is already in the pivot language.
+    if not canonical:
+        question = await translate_async(question, language, PIVOT_LANGUAGE)
+    result = await answer_async(question, pdf_name, conversation)
+    if result["response"] and not is_error(result["response"]):
+        result["response"] = await translate_async(result["response"], PIVOT_LANGUAGE, language)
+    return result
+
+
+async def answer_async(question, pdf_name, conversation=None):
+    # Async version of the /chat pipeline; upstream calls go through the shared semaphore
+    query = await standalone_question_async(conversation, question)
+    faq = match_faq(query, pdf_name)
+    if faq:
+        remember_turn(conversation, question, query, faq)
+        return {"response": faq, "source": "faq"}
+    with metrics.timed(stage_seconds, "timetable"):
+        timetable_index, timetable_text = get_timetable(pdf_name)
+        direct = timetable_index.answer(query) if timetable_index else None
+    if direct:
+        remember_turn(conversation, question, query, direct)
+        return {"response": direct, "source": "timetable"}
+
+    scope = cache_scope(pdf_name)
+    version = answer_cache.version(scope)
+    history = conversation.history() if is_follow_up(conversation, question) else ""
+
+    # Vector/BM25 search is CPU-bound and synchronous, so keep it off the event loop
+    loop = asyncio.get_running_loop()
+    query_vector = None
+    if not (RETRIEVAL_MODE == "lexical_first" and await loop.run_in_executor(None, lexical_confident, query, pdf_name)):
+        try:
+            with metrics.timed(stage_seconds, "embed"):
+                query_vector = await chat_service.upstream(query_embeddings.aembed_query(query))
+        except Exception as e:
+            if RETRIEVAL_MODE == "vector":
+                raise
+            print("Query embedding failed, using lexical retrieval only:", e)
+    if query_vector is not None and not history:
+        with metrics.timed(stage_seconds, "cache_lookup"):
+            cached = answer_cache.lookup(query_vector, scope)
+        if cached is not None:
+            remember_turn(conversation, question, query, cached)
+            return {"response": cached, "cached": True}
+
+    docs = await loop.run_in_executor(None, search_shards, query, query_vector, pdf_name, CONTEXT_CANDIDATES)
+    if docs is None:
+        return {"response": f"Error: Vector store for {pdf_name} not found!"}
+    docs, timetable_text, _ = pack_context(query, docs, timetable_text)
+
+    prompt = build_prompt(query, timetable_text, history)
+    response = await generate_answer_async(query, docs, prompt)
+
+    if response and not history:
+        answer_cache.store(query_vector, scope, response, version)
+    remember_turn(conversation, question, query, response)
+    return {"response": response}
+
+
+@app.route("/chat", methods=["POST"])
+def chat():
+    # Handling Chat Enquiry
+    if ASYNC_CHAT:
+        data = request.json
+        query = data.get("message", "")
+        pdf_name = data.get("pdf_name", "")
+        if not query:
+            return jsonify({"response": "Error: Empty query!"})
+        # Identical questions already being answered share the in-flight result
+        # (within a session, since follow-ups depend on its history)
+        conversation = get_conversation(data)
+        language = resolve_language(data.get("language"))
+        canonical = bool(data.get("faq"))
+        key = (normalise_question(query), cache_scope(pdf_name), data.get("session_id"), language, canonical)
+        result = chat_service.run(key, lambda: chat_async(query, pdf_name, conversation, language, canonical))
+        chat_requests.inc(1, "cache" if result.get("cached") else result.get("source", "rag"))
+        return jsonify(result)
+
+    state = prepare_chat(request.json)
+    chat_requests.inc(1, answer_source(state))
+    if "error" in state:
+        return jsonify({"response": state["error"]})
+    language = state["language"]
+    if "cached" in state:
+        remember_turn(state["conversation"], state["question"], state["query"], state["cached"])
+        return jsonify({"response": translate(state["cached"], PIVOT_LANGUAGE, language), "cached": True})
+    if "faq" in state:
+        remember_turn(state["conversation"], state["question"], state["query"], state["faq"])
+        return jsonify({"response": translate(state["faq"], PIVOT_LANGUAGE, language), "source": "faq"})
+    if "direct" in state:
+        remember_turn(state["conversation"], state["question"], state["query"], state["direct"])
+        return jsonify({"response": translate(state["direct"], PIVOT_LANGUAGE, language), "source": "timetable"})
+
+    query, docs = state["query"], state["docs"]
+    prompt = build_prompt(query, state["timetable_text"], state["history"])
+    response = generate_answer(query, docs, prompt)
+
+    if response and not state["history"]:
+        answer_cache.store(state["query_vector"], state["scope"], response, state["version"])
+    remember_turn(state["conversation"], state["question"], query, response)
+    response = translate(response, PIVOT_LANGUAGE, language)
+    if request.json.get("debug"):
+        return jsonify({"response": response, "context": state["context"]})
     return jsonify({"response": response})
 
 
+def sse(event, payload):
+    # Format one Server-Sent Event
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.route("/chat_stream", methods=["POST"])
+def chat_stream():
+    # Streaming variant of /chat: forwards model tokens as Server-Sent Events
+    state = prepare_chat(request.json)
+    chat_requests.inc(1, answer_source(state))
+    debug = bool((request.json or {}).get("debug"))
+    timings = request_timings.get()
+
+    def done(payload):
+        # Streamed responses report their stage timings in the final event
+        if debug and timings is not None:
+            payload["timings"] = {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()}
+        return "done", payload
+
+    def answer():
+        # (event, payload) pairs for the pivot-language answer
+        # Errors, cached, FAQ and timetable answers are sent as a single token
+        for key in ("error", "cached", "faq", "direct"):
+            if key in state:
+                if key != "error":
+                    remember_turn(state["conversation"], state["question"], state["query"], state[key])
+                yield "token", {"token": state[key]}
+                yield done({"cached": key == "cached", "source": {"direct": "timetable", "faq": "faq"}.get(key)})
+                return
+
+        query, docs = state["query"], state["docs"]
+        prompt = build_prompt(query, state["timetable_text"], state["history"])
+        if docs and FALLBACK_STRATEGY == VERDICT:
+            prompt += VERDICT_INSTRUCTIONS
+        full_prompt = stuff_prompt(docs, prompt) if docs else prompt
+
+        # Speculatively compute the fallback while the grounded answer streams
+        fallback_future = None
+        if docs and FALLBACK_STRATEGY == SPECULATIVE:
+            fallback_future = generation_pool.submit(in_context(invoke_llm), build_fallback_prompt(query), "fallback")
+
+        parts = []
+        head = ""  # verdict mode: hold tokens back until the verdict prefix is known
+        answered = True
+        started = time.perf_counter()
+        first_token = True
+        for token in stream_llm(full_prompt):
+            if first_token:
+                metrics.record(stage_seconds, time.perf_counter() - started, "first_token")
+                first_token = False
+            if docs and FALLBACK_STRATEGY == VERDICT and head is not None:
+                head += token
+                if ":" not in head and len(head) < 20:
+                    continue
+                answered, token = parse_verdict(head)
+                head = None
+            parts.append(token)
+            yield "token", {"token": token}
+        if head:
+            answered, token = parse_verdict(head)
+            parts.append(token)
+            yield "token", {"token": token}
+        response = "".join(parts)
+        metrics.record(stage_seconds, time.perf_counter() - started, "generate")
+        count_tokens(full_prompt, response)
+
+        if docs and FALLBACK_STRATEGY == VERDICT:
+            fallback_telemetry.record(not answered)
+        elif docs and is_negative(response):
+            # A negative grounded answer is replaced by the general-knowledge answer
+            yield "reset", {}
+            if fallback_future is not None:
+                response = fallback_future.result()
+                yield "token", {"token": response}
+            else:
+                parts = []
+                started = time.perf_counter()
+                for token in stream_llm(build_fallback_prompt(query)):
+                    parts.append(token)
+                    yield "token", {"token": token}
+                response = "".join(parts)
+                metrics.record(stage_seconds, time.perf_counter() - started, "fallback")
+                count_tokens(build_fallback_prompt(query), response)
+            fallback_telemetry.record(True)
+        elif docs:
+            discarded = fallback_future is not None and not fallback_future.cancel()
+            fallback_telemetry.record(False, discarded)
+
+        if response and not state["history"]:
+            answer_cache.store(state["query_vector"], state["scope"], response, state["version"])
+        remember_turn(state["conversation"], state["question"], query, response)
+        yield done({"cached": False, "context": state["context"]} if debug else {"cached": False})
+
+    def generate():
+        request_timings.set(timings)
+        language = state.get("language", PIVOT_LANGUAGE)
+        if language == PIVOT_LANGUAGE or "error" in state:
+            for event, payload in answer():
+                yield sse(event, payload)
+            return
+
+        # Other languages: the pivot answer is produced silently, then streamed in translation.
+        # The first translated token therefore waits for the whole pivot answer; translating
+        # while it streams would give up the per-answer translation cache and verdict/reset handling.
+        text = ""
+        for event, payload in answer():
+            if event == "token":
+                text += payload["token"]
+            elif event == "reset":
+                text = ""
+            elif event == "done":
+                for token in stream_translation(text, language) if text else ():
+                    yield sse("token", {"token": token})
+                yield sse(event, payload)
+
+    def generate_or_shed():
+        # The 200 status is already sent once streaming starts, so a shed call ends the stream instead
+        try:
+            yield from generate()
+        except UpstreamBusy as e:
+            yield sse("reset", {})
+            yield sse("token", {"token": BUSY_MESSAGE})
+            yield sse("done", {"cached": False, "retry_after": e.retry_after})
+
+    return Response(stream_with_context(generate_or_shed()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/faq", methods=["GET"])
+def list_faq():
+    # Precomputed answers to common questions, for one document or all of them.
+    # "canonical" is the question to send to /chat, with "faq": true so it is not translated again;
+    # translations are cached after the first request.
+    pdf_name = request.args.get("pdf_name", "")
+    language = resolve_language(request.args.get("language"))
+    index = get_faq(pdf_name)
+
+    def localise(entry):
+        return {
+            "question": translate(entry["question"], PIVOT_LANGUAGE, language),
+            "answer": translate(entry["answer"], PIVOT_LANGUAGE, language),
+            "canonical": entry["question"],
+            "source": entry["source"],
+        }
+
+    entries = list(generation_pool.map(in_context(localise), index.entries)) if index else []
+    return jsonify({"language": language, "faqs": entries})
+
+
+@app.route("/end_session", methods=["POST"])
+def end_session():
+    # Forget a chat session's history (e.g. when the student starts a new chat)
+    session_id = (request.json or {}).get("session_id", "")
+    if not session_id:
+        return jsonify({"error": "No session id provided"}), 400
+    return jsonify({"ended": conversations.end(str(session_id))})
+
+
 @app.route("/list_pdfs", methods=["GET"])
 def list_pdfs():
     # Returns a list of processed PDF files
@@ -162,18 +1440,109 @@ def delete_pdf():
     if not pdf_name:
         return jsonify({"error": "No PDF name provided"}), 400
 
+    pdf_name = os.path.basename(pdf_name)
     pdf_path = os.path.join(UPLOAD_FOLDER, pdf_name)
-    store_path = os.path.join("vector_stores", "orientation")
+    store_path = store_path_for(pdf_name)
 
-    if os.path.exists(pdf_path):
-        os.remove(pdf_path)
+    # Waits for a running ingestion of this PDF; uploads still queued are dropped
+    with store_lock(store_path):
+        with store_locks_guard:
+            deletions[pdf_name] = deletions.get(pdf_name, 0) + 1
+        # Files go first, then the caches: a request reloading in between finds nothing to cache
+        with faq_write_lock:
+            if os.path.exists(pdf_path):
+                os.remove(pdf_path)
+            if os.path.exists(faq_path_for(pdf_name)):
+                os.remove(faq_path_for(pdf_name))
+            invalidate_faq(pdf_name)
+        if os.path.exists(timetable_path_for(pdf_name)):
+            os.remove(timetable_path_for(pdf_name))
+        if os.path.exists(store_path):
+            shutil.rmtree(store_path)
 
-    if os.path.exists(store_path):
-        shutil.rmtree(store_path)
+        invalidate_timetable(pdf_name)
+        store_registry.invalidate(store_path)
+        answer_cache.invalidate(cache_scope(pdf_name))
 
     return jsonify({"message": f"PDF {pdf_name} and its vector store have been deleted."})
 
+
+# Existing cache/registry/service counters, read at scrape time
+metrics.gauge("chatbot_answer_cache_hits_total", "Semantic answer cache hits",
+              lambda: answer_cache.stats()["hits"], metric_type="counter")
+metrics.gauge("chatbot_answer_cache_misses_total", "Semantic answer cache misses",
+              lambda: answer_cache.stats()["misses"], metric_type="counter")
+metrics.gauge("chatbot_answer_cache_entries", "Answers held in the semantic cache",
+              lambda: answer_cache.stats()["entries"])
+metrics.gauge("chatbot_store_registry_hits_total", "Vector store registry hits",
+              lambda: store_registry.stats()["hits"], metric_type="counter")
+metrics.gauge("chatbot_store_registry_misses_total", "Vector store registry misses (loads from disk)",
+              lambda: store_registry.stats()["misses"], metric_type="counter")
+metrics.gauge("chatbot_store_registry_bytes", "On-disk size of the vector stores held in memory",
+              lambda: store_registry.stats()["bytes"])
+metrics.gauge("chatbot_fallbacks_total", "Answers replaced by the general-knowledge fallback",
+              lambda: fallback_telemetry.stats()["fallbacks"], metric_type="counter")
+metrics.gauge("chatbot_discarded_speculations_total", "Speculative fallback generations that were not used",
+              lambda: fallback_telemetry.stats()["discarded_speculations"], metric_type="counter")
+metrics.gauge("chatbot_translation_cache_hits_total", "Translation cache hits",
+              lambda: {("question",): question_translations.stats()["hits"],
+                       ("answer",): answer_translations.stats()["hits"]}, ("kind",), metric_type="counter")
+metrics.gauge("chatbot_translation_cache_misses_total", "Translation cache misses (LLM translations)",
+              lambda: {("question",): question_translations.stats()["misses"],
+                       ("answer",): answer_translations.stats()["misses"]}, ("kind",), metric_type="counter")
+metrics.gauge("chatbot_sessions", "Active chat sessions", lambda: conversations.stats()["sessions"])
+metrics.gauge("chatbot_active_upstream_calls", "Upstream calls in flight (async chat mode)",
+              lambda: chat_service.stats()["active_upstream"] if chat_service else None)
+metrics.gauge("chatbot_upstream_queue_depth", "Upstream calls waiting for admission",
+              lambda: {(priority,): depth for priority, depth in upstream.stats()["queue_depth"].items()},
+              ("priority",))
+metrics.gauge("chatbot_upstream_oldest_wait_seconds", "How long the oldest queued upstream call has waited",
+              lambda: upstream.stats()["oldest_wait_seconds"])
+metrics.gauge("chatbot_upstream_admitted_calls", "Upstream calls currently admitted by the scheduler",
+              lambda: upstream.stats()["active"])
+metrics.gauge("chatbot_upstream_shed_total", "Upstream calls shed with a 429",
+              lambda: {("queue_full",): upstream.stats()["rejected"], ("deadline",): upstream.stats()["expired"]},
+              ("reason",), metric_type="counter")
+metrics.gauge("chatbot_upstream_retries_total", "Upstream calls retried after a quota or availability error",
+              lambda: upstream.stats()["retried"], metric_type="counter")
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    # Prometheus text exposition format
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    # Cache counters, used to tune the similarity threshold and store budget
+    faq_index = get_faq()
+    return jsonify({
+        "answer_cache": answer_cache.stats(),
+        "store_registry": store_registry.stats(),
+        "chat_service": chat_service.stats() if chat_service else None,
+        "fallback": fallback_telemetry.stats(),
+        "context": context_packer.stats(),
+        "conversations": conversations.stats(),
+        "translations": {"questions": question_translations.stats(), "answers": answer_translations.stats()},
+        "upstream": upstream.stats(),
+        "faq": {"entries": len(faq_index.entries) if faq_index else 0},
+    })
+
+
+# Start-up ingestion runs in the serving process only, once everything above is defined.
+# Imported by a WSGI server (or the benchmark harness) this module is named "backend";
+# it is neither in the debug reloader's watcher process nor when multiprocessing
+# workers re-import the entry script as "__mp_main__".
+if __name__ == "backend":
+    start_warm_up()
+
+
 if __name__ == "__main__":
+    # app.run(debug=True) runs this file twice: in a watcher process and in the serving
+    # child it restarts on code changes, which is the one with WERKZEUG_RUN_MAIN set
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_warm_up()
     app.run(debug=True, host="0.0.0.0", port=5000)
 
 
@@ -181,6 +1550,14 @@ if __name__ == "__main__":
 # curl -X POST -F "file=@data/TR1S-Full-Time-Orientation-Schedule.pdf" http://127.0.0.1:5001/upload
 
 
+# # upload with a compressed vector index (flat, float16, ivf, pq or ivfpq)
+# curl -X POST -F "file=@data/TR1S-Full-Time-Orientation-Schedule.pdf" -F "index_type=float16" http://127.0.0.1:5001/upload
+
+
+# # /ingest_status (progress of a background upload)
+# curl -X GET http://127.0.0.1:5001/ingest_status/<job_id>
+
+
 # # chat (Q&A API)
 # # Select different PDFs for querying
 # # Avoid repeated loading, improve query efficiency
@@ -189,6 +1566,52 @@ if __name__ == "__main__":
 #     -H "Content-Type: application/json" \
 #     -d '{"message": "What documents do I need?", "pdf_name": "TR1S-Full-Time-Orientation-Schedule.pdf"}'
 
+# # /chat_stream (streaming Q&A API)
+# # Same payload as /chat, answers arrive token by token as Server-Sent Events
+# curl -N -X POST http://127.0.0.1:5001/chat_stream \
+#     -H "Content-Type: application/json" \
+#     -d '{"message": "Where is the Explore Booth?"}'
+
+# # /chat with per-stage timings in the response (also sent as a Server-Timing header when TIMING_HEADER=1)
+# curl -X POST http://127.0.0.1:5001/chat \
+#     -H "Content-Type: application/json" \
+#     -d '{"message": "What documents do I need?", "debug": true}'
+
+# # /metrics (Prometheus scrape endpoint)
+# curl -X GET http://127.0.0.1:5001/metrics
+
+# # /ready (readiness probe, 503 while the existing indexes are being mapped)
+# curl -X GET http://127.0.0.1:5001/ready
+
+# # Multi-turn chat: follow-ups with the same session_id are answered in context
+# curl -X POST http://127.0.0.1:5001/chat \
+#     -H "Content-Type: application/json" \
+#     -d '{"message": "And where is that?", "session_id": "3f2b9c"}'
+
+# # Answers in the student's language (languages.json labels or ISO codes such as "zh", "vi")
+# curl -X POST http://127.0.0.1:5001/chat \
+#     -H "Content-Type: application/json" \
+#     -d '{"message": "Explore Booth 在哪里？", "language": "中文"}'
+
+# # Per-model upstream budgets; a full queue or a missed admission deadline returns 429 with Retry-After
+# UPSTREAM_LIMITS='{"gemini-2.0-flash": {"rpm": 15, "tpm": 1000000}, "models/embedding-001": {"rpm": 1500}}' \
+#     UPSTREAM_QUEUE_SIZE=64 UPSTREAM_CHAT_DEADLINE=20 python backend.py
+# curl -i -X POST http://127.0.0.1:5001/chat \
+#     -H "Content-Type: application/json" \
+#     -d '{"message": "Where is the Explore Booth?"}'
+
+# # /faq (answers to common questions, precomputed at ingest time; optional pdf_name and language)
+# curl -X GET "http://127.0.0.1:5001/faq?language=zh"
+# # A picked question is sent in its canonical form, flagged so it is matched without translation
+# curl -X POST http://127.0.0.1:5001/chat \
+#     -H "Content-Type: application/json" \
+#     -d '{"message": "What documents do I need?", "faq": true, "language": "zh"}'
+
+# # /end_session (forget a session's history)
+# curl -X POST http://127.0.0.1:5001/end_session \
+#     -H "Content-Type: application/json" \
+#     -d '{"session_id": "3f2b9c"}'
+
 # # /list_pdfs (view uploaded PDFs)
 # # List all processed PDFs
 # # Convenient front-end dynamic update file list
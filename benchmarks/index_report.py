@@ -0,0 +1,136 @@
+"""Recall@k, search latency and bytes per vector of each vector index type.
+
+Every index type is built in memory over the vectors of an existing store and
+compared against exact flat search:
+
+    python benchmarks/index_report.py vector_stores/TR1S-Full-Time-Orientation-Schedule
+
+Real stores are often too small to show a difference, so --synthetic builds a
+clustered random corpus of the given size instead:
+
+    python benchmarks/index_report.py --synthetic 50000 --dim 768 --param nlist=256
+
+Queries are stored vectors; each query's own row is excluded from both the
+exact and the approximate results, so recall is not inflated by self-matches.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from rebuild_index import parse_params  # noqa: E402
+from snapshot_store import SnapshotStore  # noqa: E402
+from vector_index import INDEX_TYPES, build_index  # noqa: E402
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))]
+
+
+def synthetic_vectors(count, dim, rng):
+    # Gaussian clusters, closer to real embeddings than uniform noise
+    centres = rng.normal(size=(max(1, count // 50), dim)).astype(np.float32)
+    vectors = centres[rng.integers(len(centres), size=count)] + 0.3 * rng.normal(size=(count, dim)).astype(np.float32)
+    return vectors.astype(np.float32)
+
+
+def neighbours(index, query, row, k):
+    # Top-k rows for a stored vector, without the vector itself
+    _, rows = index.search(query, k + 1)
+    return [r for r in rows.tolist() if r != row][:k]
+
+
+def evaluate(vectors, index_type, params, query_rows, k, baseline):
+    started = time.perf_counter()
+    index = build_index(vectors, index_type, params)
+    build_seconds = time.perf_counter() - started
+
+    latencies, recalls = [], []
+    for row in query_rows:
+        started = time.perf_counter()
+        found = neighbours(index, vectors[row], row, k)
+        latencies.append(time.perf_counter() - started)
+        expected = baseline[row]
+        recalls.append(len(set(found) & set(expected)) / len(expected) if expected else 1.0)
+    return {
+        "type": index_type,
+        "params": getattr(index, "params", {}),
+        "recall_at_k": round(sum(recalls) / len(recalls), 4),
+        "latency_ms": {f"p{p}": round(percentile(latencies, p) * 1000, 3) for p in (50, 95)},
+        "bytes_per_vector": round(index.nbytes / len(vectors), 1),
+        "build_seconds": round(build_seconds, 3),
+    }
+
+
+def report(name, vectors, types, params, queries, k, rng):
+    query_rows = rng.choice(len(vectors), size=min(queries, len(vectors)), replace=False).tolist()
+    exact = build_index(vectors, "flat")
+    baseline = {row: neighbours(exact, vectors[row], row, k) for row in query_rows}
+    results = []
+    for index_type in types:
+        try:
+            results.append(evaluate(vectors, index_type, params, query_rows, k, baseline))
+        except (ValueError, RuntimeError, ImportError) as e:
+            results.append({"type": index_type, "error": str(e)})
+    return {"store": name, "vectors": len(vectors), "dim": int(vectors.shape[1]), "k": k, "results": results}
+
+
+def print_report(entry):
+    print(f"\n{entry['store']}: {entry['vectors']} vectors x {entry['dim']} dims, recall@{entry['k']} vs flat")
+    print(f"  {'type':<8} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'bytes/vec':>10} {'build s':>8}  params")
+    for result in entry["results"]:
+        if "error" in result:
+            print(f"  {result['type']:<8} error: {result['error']}")
+            continue
+        latency = result["latency_ms"]
+        print(f"  {result['type']:<8} {result['recall_at_k']:>7.3f} {latency['p50']:>8.3f} {latency['p95']:>8.3f} "
+              f"{result['bytes_per_vector']:>10.1f} {result['build_seconds']:>8.3f}  {result['params'] or ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vector index types against exact flat search.")
+    parser.add_argument("stores", nargs="*", help="Store directories to read vectors from")
+    parser.add_argument("--synthetic", type=int, help="Use a synthetic corpus of this many vectors instead")
+    parser.add_argument("--dim", type=int, default=768, help="Dimensions of the synthetic corpus")
+    parser.add_argument("--types", default=",".join(INDEX_TYPES), help="Comma-separated index types")
+    parser.add_argument("--param", action="append", default=[], help="Index parameter as key=value (repeatable)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    types = [t for t in args.types.split(",") if t]
+    params = parse_params(args.param)
+
+    corpora = []
+    if args.synthetic:
+        corpora.append((f"synthetic-{args.synthetic}", synthetic_vectors(args.synthetic, args.dim, rng)))
+    for store_path in args.stores:
+        snapshot = SnapshotStore.open(store_path)
+        if snapshot is None:
+            print(f"{store_path}: no snapshot, skipped")
+            continue
+        corpora.append((store_path, snapshot.all_vectors()))
+    if not corpora:
+        parser.error("give at least one store or --synthetic")
+
+    entries = [report(name, vectors, types, params, args.queries, args.k, rng) for name, vectors in corpora if len(vectors) > 1]
+    for entry in entries:
+        print_report(entry)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(entries, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""Offline load test for the chatbot backend.
+
+Replays a corpus of orientation questions against /chat (or /chat_stream) and
+optionally /upload at a fixed concurrency, then reports p50/p95/p99 latency,
+throughput and per-stage breakdowns.
+
+By default the backend runs in-process against the deterministic fake
+embedder and LLM (see providers.py) inside a temporary copy of the data
+folders, so it needs no network and never touches the real indexes:
+
+    python benchmarks/run_benchmark.py --requests 200 --concurrency 16
+
+Use --url to benchmark a running server instead:
+
+    python benchmarks/run_benchmark.py --url http://127.0.0.1:5000
+"""
+import argparse
+import io
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_QUESTIONS = os.path.join(REPO_ROOT, "benchmarks", "questions.txt")
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Nearest-rank percentile
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def parse_server_timing(header):
+    # "embed;dur=12.3, search;dur=4.5" -> {"embed": 12.3, "search": 4.5} (milliseconds)
+    timings = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur" and name:
+                try:
+                    timings[name] = float(value)
+                except ValueError:
+                    pass
+    return timings
+
+
+def read_events(lines):
+    event = "message"
+    for line in lines:
+        line = line.strip()
+        if not line:
+            event = "message"
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            yield event, json.loads(line[len("data:"):].strip())
+
+
+class HttpTarget:
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+
+    def post_json(self, path, payload, stream=False):
+        request = urllib.request.Request(
+            self.url + path, data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST")
+        start = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            headers = dict(response.headers)
+            if not stream:
+                return response.status, headers, json.loads(response.read()), None
+            lines = (raw.decode("utf-8") for raw in response)
+            return (response.status, headers) + consume_stream(lines, start)
+
+    def get_json(self, path):
+        with urllib.request.urlopen(self.url + path) as response:
+            return json.loads(response.read())
+
+    def upload(self, name, content):
+        boundary = "benchmark-boundary"
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{name}\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n"
+        ).encode("utf-8") + content + f"\r\n--{boundary}--\r\n".encode("utf-8")
+        request = urllib.request.Request(
+            self.url + "/upload", data=body,
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}, method="POST")
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+
+
+class InProcessTarget:
+    def __init__(self, app):
+        self.app = app
+
+    def post_json(self, path, payload, stream=False):
+        client = self.app.test_client()
+        start = time.perf_counter()
+        response = client.post(path, json=payload, buffered=not stream)
+        headers = dict(response.headers)
+        if not stream:
+            return response.status_code, headers, response.get_json(), None
+        chunks = (chunk.decode("utf-8") for chunk in response.iter_encoded())
+        lines = (line for chunk in chunks for line in chunk.splitlines())
+        return (response.status_code, headers) + consume_stream(lines, start)
+
+    def get_json(self, path):
+        return self.app.test_client().get(path).get_json()
+
+    def upload(self, name, content):
+        response = self.app.test_client().post(
+            "/upload", data={"file": (io.BytesIO(content), name)}, content_type="multipart/form-data")
+        return response.status_code, response.get_json()
+
+
+def wait_ready(target, timeout=300.0, interval=0.1):
+    # The backend is ready once its existing indexes are mapped; documents with no index yet
+    # are still "building" and would only be answered with a 503, so wait for those too
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            status = target.get_json("/ready") or {}
+            if status.get("ready") and not status.get("building"):
+                return
+        except OSError:
+            pass  # 503 while warming up (urllib raises HTTPError)
+        time.sleep(interval)
+    raise RuntimeError(f"Backend not ready after {timeout:.0f}s")
+
+
+def consume_stream(lines, start):
+    # Returns (body, time to first token) for a Server-Sent Events response
+    ttft, text, done = None, "", {}
+    for event, payload in read_events(lines):
+        if event == "token":
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            text += payload.get("token", "")
+        elif event == "reset":
+            text = ""
+        elif event == "done":
+            done = payload
+    return dict(done, response=text), ttft
+
+
+def answer_source(body):
+    if not body:
+        return "error"
+    if body.get("cached"):
+        return "cached"
+    return body.get("source") or "rag"
+
+
+def run_chat(target, endpoint, question, pdf_name):
+    payload = {"message": question}
+    if pdf_name:
+        payload["pdf_name"] = pdf_name
+    start = time.perf_counter()
+    try:
+        status, headers, body, ttft = target.post_json(f"/{endpoint}", payload, stream=endpoint == "chat_stream")
+    except Exception as e:
+        return {"endpoint": endpoint, "latency": time.perf_counter() - start, "error": str(e), "source": "error"}
+    timings = parse_server_timing(headers.get("Server-Timing"))
+    return {
+        "endpoint": endpoint,
+        "latency": time.perf_counter() - start,
+        "ttft": ttft,
+        "status": status,
+        "source": answer_source(body) if status == 200 else "error",
+        "server_timing": timings,
+    }
+
+
+def run_upload(target, pdf_path, poll_interval):
+    with open(pdf_path, "rb") as file:
+        content = file.read()
+    start = time.perf_counter()
+    status, body = target.upload(os.path.basename(pdf_path), content)
+    accepted = time.perf_counter() - start
+    job_id = (body or {}).get("job_id")
+    if not job_id:
+        return {"endpoint": "upload", "latency": accepted, "error": f"HTTP {status}: {body}"}
+
+    while True:
+        job = target.get_json(f"/ingest_status/{job_id}")
+        if job.get("status") in ("done", "failed"):
+            break
+        time.sleep(poll_interval)
+    total = time.perf_counter() - start
+    report = job.get("report") or {}
+    return {
+        "endpoint": "upload",
+        "latency": accepted,
+        "ingest_seconds": total,
+        "error": job.get("error"),
+        "stage_seconds": job.get("stage_seconds", {}),
+        "pages": job.get("pages_total", 0),
+        "chunks": report.get("chunks", 0),
+        "embedded": report.get("embedded", 0),
+    }
+
+
+def summarise(results, wall_seconds):
+    summary = {"wall_seconds": wall_seconds, "endpoints": {}}
+    by_endpoint = defaultdict(list)
+    for result in results:
+        by_endpoint[result["endpoint"]].append(result)
+
+    for endpoint, items in by_endpoint.items():
+        latencies = [item["latency"] for item in items if not item.get("error")]
+        entry = {
+            "requests": len(items),
+            "errors": sum(1 for item in items if item.get("error") or item.get("source") == "error"),
+            "throughput_rps": len(items) / wall_seconds if wall_seconds else 0.0,
+            "latency_ms": {f"p{p}": _ms(percentile(latencies, p)) for p in (50, 95, 99)},
+        }
+
+        ttfts = [item["ttft"] for item in items if item.get("ttft") is not None]
+        if ttfts:
+            entry["ttft_ms"] = {f"p{p}": _ms(percentile(ttfts, p)) for p in (50, 95, 99)}
+
+        # Breakdown by how the answer was produced (timetable, cache, full RAG)
+        sources = defaultdict(list)
+        for item in items:
+            if "source" in item:
+                sources[item["source"]].append(item["latency"])
+        if sources:
+            entry["by_source"] = {
+                source: {"count": len(values), "p50_ms": _ms(percentile(values, 50)), "p95_ms": _ms(percentile(values, 95))}
+                for source, values in sources.items()
+            }
+
+        # Server-side per-stage timings, when the server reports them
+        stages = defaultdict(list)
+        for item in items:
+            for stage, duration in item.get("server_timing", {}).items():
+                stages[stage].append(duration)
+            for stage, duration in item.get("stage_seconds", {}).items():
+                stages[stage].append(duration * 1000)
+        if stages:
+            entry["stages_ms"] = {
+                stage: {"count": len(values), "p50": round(percentile(values, 50), 2), "p95": round(percentile(values, 95), 2)}
+                for stage, values in sorted(stages.items())
+            }
+
+        if endpoint == "upload":
+            ingest = [item["ingest_seconds"] for item in items if "ingest_seconds" in item]
+            entry["ingest_ms"] = {f"p{p}": _ms(percentile(ingest, p)) for p in (50, 95, 99)}
+            seconds = sum(ingest)
+            if seconds:
+                entry["pages_per_second"] = round(sum(item.get("pages", 0) for item in items) / seconds, 2)
+                entry["chunks_per_second"] = round(sum(item.get("chunks", 0) for item in items) / seconds, 2)
+
+        summary["endpoints"][endpoint] = entry
+    return summary
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def print_summary(summary):
+    print(f"Wall time: {summary['wall_seconds']:.2f}s")
+    startup = summary.get("startup", {})
+    if startup.get("import_seconds") is not None:
+        print(f"Startup: import {startup['import_seconds']:.2f}s, ready after {startup['ready_seconds']:.2f}s more")
+    for endpoint, entry in summary["endpoints"].items():
+        latency = entry["latency_ms"]
+        print(f"\n/{endpoint}: {entry['requests']} requests, {entry['errors']} errors, "
+              f"{entry['throughput_rps']:.2f} req/s")
+        print(f"  latency ms  p50={latency['p50']}  p95={latency['p95']}  p99={latency['p99']}")
+        if "ttft_ms" in entry:
+            ttft = entry["ttft_ms"]
+            print(f"  TTFT ms     p50={ttft['p50']}  p95={ttft['p95']}  p99={ttft['p99']}")
+        if "ingest_ms" in entry:
+            ingest = entry["ingest_ms"]
+            print(f"  ingest ms   p50={ingest['p50']}  p95={ingest['p95']}  p99={ingest['p99']}")
+            if "pages_per_second" in entry:
+                print(f"  throughput  {entry['pages_per_second']} pages/s, {entry['chunks_per_second']} chunks/s")
+        for source, stats in sorted(entry.get("by_source", {}).items()):
+            print(f"  source {source:<10} n={stats['count']:<5} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms")
+        for stage, stats in entry.get("stages_ms", {}).items():
+            print(f"  stage  {stage:<10} n={stats['count']:<5} p50={stats['p50']}ms p95={stats['p95']}ms")
+
+
+def in_process_target(live):
+    # Run the backend from a scratch copy of the data folders so the real indexes are untouched
+    if not live:
+        os.environ.setdefault("EMBEDDING_PROVIDER", "fake")
+        os.environ.setdefault("LLM_PROVIDER", "fake")
+        os.environ.setdefault("TIMING_HEADER", "1")
+    workdir = tempfile.mkdtemp(prefix="chatbot-bench-")
+    for folder in ("uploaded_pdfs", "timetables"):
+        source = os.path.join(REPO_ROOT, folder)
+        if os.path.isdir(source):
+            shutil.copytree(source, os.path.join(workdir, folder))
+    # The FAQ question list, so warm-up precomputes the answers served without a generation
+    shutil.copy(os.path.join(REPO_ROOT, "faq_questions.json"), workdir)
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+    started = time.perf_counter()
+    import backend
+    import_seconds = time.perf_counter() - started
+    return InProcessTarget(backend.app), workdir, import_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay orientation questions against the chatbot backend.")
+    parser.add_argument("--url", help="Benchmark a running server instead of an in-process fake-backed one")
+    parser.add_argument("--live", action="store_true", help="In-process, but with the real Google providers")
+    parser.add_argument("--endpoint", choices=("chat", "chat_stream"), default="chat")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS)
+    parser.add_argument("--requests", type=int, default=100, help="Number of chat requests to send")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--pdf-name", default="", help="Target a single document; default searches all")
+    parser.add_argument("--upload", action="append", default=[], help="PDF to upload during the run (repeatable)")
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the summary to this file")
+    args = parser.parse_args()
+
+    with open(args.questions, "r", encoding="utf-8") as file:
+        questions = [line.strip() for line in file if line.strip() and not line.startswith("#")]
+    rng = random.Random(args.seed)
+    workload = [rng.choice(questions) for _ in range(args.requests)]
+
+    args.upload = [os.path.abspath(path) for path in args.upload]
+    workdir, import_seconds = None, None
+    if args.url:
+        target = HttpTarget(args.url)
+    else:
+        target, workdir, import_seconds = in_process_target(args.live)
+
+    try:
+        started = time.perf_counter()
+        wait_ready(target)
+        ready_seconds = time.perf_counter() - started
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = [pool.submit(run_upload, target, path, args.poll_interval) for path in args.upload]
+            futures += [pool.submit(run_chat, target, args.endpoint, question, args.pdf_name) for question in workload]
+            results = [future.result() for future in futures]
+        wall_seconds = time.perf_counter() - start
+    finally:
+        if workdir:
+            os.chdir(REPO_ROOT)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = summarise(results, wall_seconds)
+    summary["startup"] = {"import_seconds": import_seconds, "ready_seconds": ready_seconds}
+    print_summary(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(summary, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
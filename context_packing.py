@@ -0,0 +1,176 @@
+import re
+import threading
+
+from langchain_core.documents import Document
+
+from lexical_index import lexical_tokens
+from metrics import estimate_tokens
+
+
+def overlap_length(first, second, min_overlap=40):
+    # Length of the longest suffix of first that is also a prefix of second
+    probe = second[:min_overlap]
+    if len(probe) < min_overlap:
+        return 0
+    start = max(0, len(first) - len(second))
+    while True:
+        index = first.find(probe, start)
+        if index < 0:
+            return 0
+        if second.startswith(first[index:]):
+            return len(first) - index
+        start = index + 1
+
+
+def shingles(text, size=3):
+    words = re.findall(r"\w+", text.lower())
+    return {tuple(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def jaccard(first, second):
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def join_chunks(first, second, min_overlap=40):
+    # One text covering both chunks, or None when they do not overlap
+    if second in first:
+        return first
+    if first in second:
+        return second
+    forward = overlap_length(first, second, min_overlap)
+    if forward:
+        return first + second[forward:]
+    backward = overlap_length(second, first, min_overlap)
+    if backward:
+        return second + first[backward:]
+    return None
+
+
+def merge_overlapping(docs, min_overlap=40):
+    # Neighbouring chunks of the same document share their splitter overlap;
+    # stitch them back together so the shared text is sent once
+    merged = []
+    for doc in docs:
+        text, source, position = doc.page_content, doc.metadata.get("source"), None
+        while True:
+            match = None
+            for i, kept in enumerate(merged):
+                if kept is None or kept.metadata.get("source") != source:
+                    continue
+                joined = join_chunks(kept.page_content, text, min_overlap)
+                if joined is not None:
+                    match, text = i, joined
+                    break
+            if match is None:
+                break
+            # The merged chunk takes the better (earlier) rank of the two
+            merged[match] = None
+            position = match if position is None else min(position, match)
+        entry = Document(page_content=text, metadata=dict(doc.metadata))
+        if position is None:
+            merged.append(entry)
+        else:
+            merged[position] = entry
+    return [doc for doc in merged if doc is not None]
+
+
+def drop_near_duplicates(docs, threshold=0.8):
+    # A chunk is dropped when most of its text already appears in a better-ranked one
+    kept, kept_shingles = [], []
+    for doc in docs:
+        doc_shingles = shingles(doc.page_content)
+        if any(len(doc_shingles & other) >= threshold * len(doc_shingles) for other in kept_shingles):
+            continue
+        kept.append(doc)
+        kept_shingles.append(doc_shingles)
+    return kept
+
+
+def mmr_order(docs, lambda_=0.7):
+    # Maximal marginal relevance over the retrieval ranking: relevance comes from
+    # the fused rank, redundancy from word overlap with chunks already chosen
+    candidates = [(1.0 - i / len(docs), doc, shingles(doc.page_content)) for i, doc in enumerate(docs)]
+    ordered, chosen = [], []
+    while candidates:
+        def score(candidate):
+            redundancy = max((jaccard(candidate[2], other) for other in chosen), default=0.0)
+            return lambda_ * candidate[0] - (1 - lambda_) * redundancy
+
+        best = max(candidates, key=score)
+        candidates.remove(best)
+        ordered.append(best[1])
+        chosen.append(best[2])
+    return ordered
+
+
+def relevant_lines(query, text):
+    # Timetable lines that share a word with the question
+    terms = set(lexical_tokens(query))
+    return "\n".join(line for line in text.splitlines() if terms & set(lexical_tokens(line)))
+
+
+class ContextPacker:
+    """Assembles the retrieved chunks and timetable into a token-budgeted prompt context."""
+
+    def __init__(self, budget=1500, mmr=False, mmr_lambda=0.7, min_overlap=40, duplicate_threshold=0.8):
+        self.budget = budget
+        self.mmr = mmr
+        self.mmr_lambda = mmr_lambda
+        self.min_overlap = min_overlap
+        self.duplicate_threshold = duplicate_threshold
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+
+    def pack(self, query, docs, timetable_text=""):
+        # Returns (docs, timetable text, report); the report counts estimated tokens
+        tokens_in = sum(estimate_tokens(doc.page_content) for doc in docs) + estimate_tokens(timetable_text)
+
+        packed = drop_near_duplicates(merge_overlapping(docs, self.min_overlap), self.duplicate_threshold)
+        if self.mmr and len(packed) > 1:
+            packed = mmr_order(packed, self.mmr_lambda)
+
+        # The structured timetable goes in first; a large one is cut down to the lines the question mentions
+        if timetable_text and estimate_tokens(timetable_text) > self.budget // 2:
+            timetable_text = relevant_lines(query, timetable_text)
+        remaining = self.budget - estimate_tokens(timetable_text)
+
+        selected = []
+        for doc in packed:
+            tokens = estimate_tokens(doc.page_content)
+            if not selected and tokens > remaining:
+                # The best chunk is always sent, cut down to the budget if it is too long
+                doc = Document(page_content=doc.page_content[:max(remaining, 0) * 4], metadata=doc.metadata)
+                tokens = estimate_tokens(doc.page_content)
+            if doc.page_content and tokens <= remaining:
+                selected.append(doc)
+                remaining -= tokens
+
+        tokens_out = sum(estimate_tokens(doc.page_content) for doc in selected) + estimate_tokens(timetable_text)
+        with self._lock:
+            self.requests += 1
+            self.tokens_in += tokens_in
+            self.tokens_out += tokens_out
+        report = {
+            "chunks_in": len(docs),
+            "chunks_out": len(selected),
+            "tokens_in": tokens_in,
+            "tokens_out": tokens_out,
+            "tokens_saved": tokens_in - tokens_out,
+        }
+        return selected, timetable_text, report
+
+    def stats(self):
+        with self._lock:
+            return {
+                "budget": self.budget,
+                "mmr": self.mmr,
+                "requests": self.requests,
+                "tokens_in": self.tokens_in,
+                "tokens_out": self.tokens_out,
+                "tokens_saved": self.tokens_in - self.tokens_out,
+                "saved_rate": (self.tokens_in - self.tokens_out) / self.tokens_in if self.tokens_in else 0.0,
+            }
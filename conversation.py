@@ -0,0 +1,162 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from async_service import normalise_question
+from metrics import estimate_tokens
+
+# Words that usually point back at an earlier turn ("and where is that?")
+FOLLOW_UP_WORDS = {
+    "it", "its", "that", "this", "there", "they", "them", "their", "those", "these",
+    "he", "she", "him", "her", "one", "same", "else", "also", "again",
+}
+FOLLOW_UP_OPENERS = ("and ", "what about", "how about", "and?", "then ")
+
+
+def needs_condensing(question):
+    # Self-contained questions skip the condensing call entirely
+    text = question.lower().strip()
+    return text.startswith(FOLLOW_UP_OPENERS) or bool(FOLLOW_UP_WORDS & set(re.findall(r"[a-z']+", text)))
+
+
+def format_turn(question, answer):
+    return f"Student: {question}\nAssistant: {answer}"
+
+
+class Conversation:
+    """One chat session: a running summary of older turns plus the most recent turns verbatim."""
+
+    def __init__(self, history_tokens=600, recent_turns=4, session_id=None):
+        self.session_id = session_id
+        self.history_tokens = history_tokens
+        self.recent_turns = recent_turns
+        self.summary = ""
+        self.turns = []  # [(question, standalone question, answer)]
+        self.version = 0  # bumped on every turn
+        self.touched = time.time()
+        self._folding = False
+        self._lock = threading.Lock()
+
+    def history(self):
+        # Summary plus as many recent turns as fit under the token ceiling, newest kept first
+        with self._lock:
+            summary = self.summary
+            budget = self.history_tokens - estimate_tokens(summary)
+            recent = []
+            for _, standalone, answer in reversed(self.turns):
+                turn = format_turn(standalone, answer)
+                if estimate_tokens(turn) > budget:
+                    break
+                recent.insert(0, turn)
+                budget -= estimate_tokens(turn)
+        parts = ([f"Summary of the earlier conversation: {summary}"] if summary else []) + recent
+        return "\n".join(parts)
+
+    def add_turn(self, question, standalone, answer):
+        with self._lock:
+            self.turns.append((question, standalone, answer))
+            self.version += 1
+            self.touched = time.time()
+
+    def turns_to_fold(self):
+        # Older turns that should be rolled into the summary; None when nothing is due
+        # or another thread is already summarising
+        with self._lock:
+            if self._folding:
+                return None
+            recent_tokens = sum(estimate_tokens(format_turn(s, a)) for _, s, a in self.turns[-self.recent_turns:])
+            keep = self.recent_turns if recent_tokens <= self.history_tokens // 2 else 1
+            if len(self.turns) <= keep:
+                return None
+            self._folding = True
+            return list(self.turns[:len(self.turns) - keep])
+
+    def fold(self, turns, summary):
+        # Replace the folded turns with the new summary, capped to a third of the ceiling
+        with self._lock:
+            self._folding = False
+            if summary is None:
+                return
+            self.summary = summary.strip()[:self.history_tokens // 3 * 4]
+            del self.turns[:len(turns)]
+
+
+class ConversationStore:
+    """Server-side chat sessions keyed by session id, expired after a period of inactivity."""
+
+    def __init__(self, ttl=3600, max_sessions=1000, history_tokens=600, recent_turns=4):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.history_tokens = history_tokens
+        self.recent_turns = recent_turns
+        self._sessions = OrderedDict()
+        # Condensed follow-ups of the current turn, keyed by (session_id, turn count, question):
+        # a retried or duplicate follow-up is not condensed twice. Dropped with the session.
+        self._standalone = {}  # session_id -> {(version, normalised question): standalone question}
+        self._lock = threading.Lock()
+        self.condensed = 0
+        self.condense_hits = 0
+        self.summaries = 0
+
+    def get(self, session_id):
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            conversation = self._sessions.get(session_id)
+            if conversation is None:
+                conversation = self._sessions[session_id] = Conversation(
+                    self.history_tokens, self.recent_turns, session_id)
+                while self.max_sessions and len(self._sessions) > self.max_sessions:
+                    self._drop(next(iter(self._sessions)))
+            self._sessions.move_to_end(session_id)
+            conversation.touched = now
+            return conversation
+
+    def end(self, session_id):
+        with self._lock:
+            return self._drop(session_id)
+
+    def standalone(self, conversation, question):
+        # The condensed form of a follow-up asked at the conversation's current turn, if known
+        with self._lock:
+            entries = self._standalone.get(conversation.session_id, {})
+            return entries.get((conversation.version, normalise_question(question)))
+
+    def remember_standalone(self, conversation, question, standalone, version):
+        # version: the turn count the question was condensed at; later turns start afresh
+        with self._lock:
+            if conversation.session_id not in self._sessions or version != conversation.version:
+                return
+            entries = self._standalone.setdefault(conversation.session_id, {})
+            for key in [key for key in entries if key[0] != version]:
+                del entries[key]
+            entries[(version, normalise_question(question))] = standalone
+
+    def record(self, event):
+        # event: "condensed", "condense_hits" or "summaries"
+        with self._lock:
+            setattr(self, event, getattr(self, event) + 1)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "condensed": self.condensed,
+                "condense_hits": self.condense_hits,
+                "summaries": self.summaries,
+                "history_tokens": self.history_tokens,
+            }
+
+    def _expire(self, now):
+        if not self.ttl:
+            return
+        while self._sessions:
+            session_id, conversation = next(iter(self._sessions.items()))
+            if now - conversation.touched <= self.ttl:
+                break
+            self._drop(session_id)
+
+    def _drop(self, session_id):
+        self._standalone.pop(session_id, None)
+        return self._sessions.pop(session_id, None) is not None
@@ -0,0 +1,75 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+
+def chunk_hash(text):
+    # Content hash used both as the chunk id in the index and as the cache key
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk cache of chunk embeddings keyed by (model name, content hash)."""
+
+    def __init__(self, path, model_name):
+        self.path = path
+        self.model_name = model_name
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model, hash))"
+            )
+
+    def get_many(self, hashes):
+        found = {}
+        with self._lock, self._connect() as conn:
+            for h in hashes:
+                row = conn.execute(
+                    "SELECT vector FROM embeddings WHERE model = ? AND hash = ?", (self.model_name, h)
+                ).fetchone()
+                if row is not None:
+                    found[h] = np.frombuffer(row[0], dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, vectors):
+        # vectors: hash -> embedding
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                [(self.model_name, h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in vectors.items()],
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def embed_with_cache(cache, embeddings, texts_by_hash, batch_size=64, progress=None):
+    # Embed only the chunks the cache has not seen; returns (vectors, reused, embedded)
+    vectors = cache.get_many(list(texts_by_hash))
+    missing = [h for h in texts_by_hash if h not in vectors]
+    reused = len(texts_by_hash) - len(missing)
+    if progress:
+        progress(reused, len(texts_by_hash))
+
+    # Embed in batches, persisting each one so an interrupted job keeps its work
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        fresh = dict(zip(batch, embeddings.embed_documents([texts_by_hash[h] for h in batch])))
+        cache.put_many(fresh)
+        vectors.update(fresh)
+        if progress:
+            progress(reused + start + len(batch), len(texts_by_hash))
+    return vectors, reused, len(missing)
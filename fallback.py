@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+# Execution strategies for the general-knowledge fallback
+SEQUENTIAL = "sequential"    # grounded answer first, fallback only if it is negative
+SPECULATIVE = "speculative"  # both requests in parallel, the loser is discarded
+VERDICT = "verdict"          # one call that says whether the documents answered
+STRATEGIES = (SEQUENTIAL, SPECULATIVE, VERDICT)
+
+VERDICT_INSTRUCTIONS = (
+    " Start your reply with 'ANSWERED:' if the given information answers the question, then give the answer. "
+    "Otherwise start with 'NOT ANSWERED:' and give a helpful answer based on general knowledge instead."
+)
+
+
+def parse_verdict(response):
+    # Returns (answered, answer text without the verdict prefix)
+    text = (response or "").strip()
+    for prefix, answered in (("NOT ANSWERED:", False), ("ANSWERED:", True)):
+        if text.upper().startswith(prefix):
+            return answered, text[len(prefix):].strip()
+    # No verdict given: treat the reply as a grounded answer
+    return True, text
+
+
+class FallbackTelemetry:
+    """Counts how often answers fall back to general knowledge."""
+
+    def __init__(self, strategy):
+        self.strategy = strategy
+        self.requests = 0
+        self.fallbacks = 0
+        self.discarded = 0  # speculative fallbacks that were computed but not used
+        self._lock = threading.Lock()
+
+    def record(self, fell_back, discarded=False):
+        with self._lock:
+            self.requests += 1
+            self.fallbacks += int(fell_back)
+            self.discarded += int(discarded)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "strategy": self.strategy,
+                "requests": self.requests,
+                "fallbacks": self.fallbacks,
+                "fallback_rate": self.fallbacks / self.requests if self.requests else 0.0,
+                "discarded_speculations": self.discarded,
+            }
+
+
+def run_speculative(pool, grounded, fallback, is_negative):
+    # Start both generations at once; worst-case latency is one generation
+    grounded_future = pool.submit(grounded)
+    fallback_future = pool.submit(fallback)
+    response = grounded_future.result()
+    if is_negative(response):
+        return fallback_future.result(), True, False
+    # cancel() only helps if the fallback has not started; otherwise its result is ignored
+    discarded = not fallback_future.cancel()
+    return response, False, discarded
+
+
+async def run_speculative_async(grounded, fallback, is_negative):
+    grounded_task = asyncio.ensure_future(grounded)
+    fallback_task = asyncio.ensure_future(fallback)
+    try:
+        response = await grounded_task
+    except BaseException:
+        fallback_task.cancel()
+        raise
+    if is_negative(response):
+        return await fallback_task, True, False
+    fallback_task.cancel()
+    return response, False, True
@@ -0,0 +1,83 @@
+import json
+import os
+
+from async_service import normalise_question
+from context_packing import jaccard
+from lexical_index import STOP_WORDS, word_tokens
+
+# Words that do not change what a question asks. Question words and negations are not among
+# them, so "What documents do I not need?" never matches "What documents do I need?".
+FILLER_WORDS = STOP_WORDS - {"how", "what", "when", "where", "which", "who"}
+
+
+def load_questions(path):
+    # {"*": [questions asked of every document], "<pdf name>": [questions for that document only]}
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def questions_for(config, pdf_name):
+    questions = []
+    for question in config.get("*", []) + config.get(os.path.basename(pdf_name), []):
+        if question not in questions:
+            questions.append(question)
+    return questions
+
+
+def load_faq(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def content_words(question):
+    return frozenset(word_tokens(question, FILLER_WORDS))
+
+
+def reusable_answers(faq, source_hash, model):
+    # Answers stay valid while the document's content hash and the model are unchanged: question -> entry
+    if not faq or faq.get("source_hash") != source_hash or faq.get("model") != model:
+        return {}
+    return {entry["question"]: entry for entry in faq.get("entries", [])}
+
+
+def save_faq(path, source, source_hash, model, entries):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump({"source": source, "source_hash": source_hash, "model": model, "entries": entries},
+                  file, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class FaqIndex:
+    """Precomputed answers, matched by normalised question first and word overlap second."""
+
+    def __init__(self, entries, threshold=0.5):
+        # [{"question", "answer", "source"}]; questions the document did not answer have no answer
+        self.entries = [entry for entry in entries if entry.get("answer")]
+        self.threshold = threshold  # Jaccard over question words; above 1 disables fuzzy matching
+        self._exact = {}
+        self._words = [set(word_tokens(entry["question"])) for entry in self.entries]
+        self._content = [content_words(entry["question"]) for entry in self.entries]
+        for entry in self.entries:
+            self._exact.setdefault(normalise_question(entry["question"]), entry)
+
+    def match(self, question):
+        key = normalise_question(question)
+        entry = self._exact.get(key)
+        if entry is not None:
+            return entry
+        # A fuzzy match must ask about the same things: only filler words may differ
+        words, content = set(word_tokens(question)), content_words(question)
+        best, best_score = None, self.threshold
+        for entry, entry_words, entry_content in zip(self.entries, self._words, self._content):
+            if entry_content != content:
+                continue
+            score = jaccard(words, entry_words)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
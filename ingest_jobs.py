@@ -0,0 +1,147 @@
+import multiprocessing
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from PyPDF2 import PdfReader
+
+
+def _extract_page_range(pdf_path, start, stop):
+    # Runs in a worker process: each worker opens its own reader
+    reader = PdfReader(pdf_path)
+    return [(reader.pages[i].extract_text() or "").replace("\n", " ") for i in range(start, stop)]
+
+
+class PageExtractor:
+    """Extracts PDF pages in parallel across worker processes."""
+
+    def __init__(self, workers=4, min_pages_per_worker=8):
+        self.workers = workers
+        self.min_pages_per_worker = min_pages_per_worker
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def extract(self, pdf_path, progress=None):
+        page_count = len(PdfReader(pdf_path).pages)
+        if progress:
+            progress(0, page_count)
+
+        # Small documents are not worth the process hand-off
+        pool = self._get_pool() if page_count >= 2 * self.min_pages_per_worker else None
+        if pool is None:
+            pages = _extract_page_range(pdf_path, 0, page_count)
+            if progress:
+                progress(page_count, page_count)
+            return pages
+
+        step = max(self.min_pages_per_worker, -(-page_count // self.workers))
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        futures = [pool.submit(_extract_page_range, pdf_path, start, stop) for start, stop in ranges]
+        pages, done = [], 0
+        for future in futures:
+            batch = future.result()
+            pages.extend(batch)
+            done += len(batch)
+            if progress:
+                progress(done, page_count)
+        return pages
+
+    def _get_pool(self):
+        # Never fork: the backend is multithreaded, and a forked child can inherit a lock some
+        # other thread held. Workers start from a clean interpreter instead and only need this
+        # module; they also re-import the entry script as __mp_main__, which must stay free of
+        # side effects (backend.py starts its warm-up only under its own module name).
+        if self.workers < 2:
+            return None
+        with self._lock:
+            if self._pool is None:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._pool
+
+
+class IngestionJob:
+    def __init__(self, pdf_name):
+        self.id = uuid.uuid4().hex
+        self.pdf_name = pdf_name
+        self._lock = threading.Lock()
+        self._state = {
+            "job_id": self.id,
+            "pdf_name": pdf_name,
+            "status": "queued",
+            "stage": "queued",
+            "pages_total": 0,
+            "pages_extracted": 0,
+            "chunks_total": 0,
+            "chunks_embedded": 0,
+            "report": None,
+            "error": None,
+            "created": time.time(),
+            "finished": None,
+            "stage_seconds": {},
+        }
+        self._stage_started = self._state["created"]
+        self._finished = threading.Event()
+
+    def update(self, **fields):
+        with self._lock:
+            # Record how long each stage took when the job moves to the next one
+            stage = fields.get("stage")
+            if stage and stage != self._state["stage"]:
+                now = time.time()
+                self._state["stage_seconds"][self._state["stage"]] = now - self._stage_started
+                self._stage_started = now
+            self._state.update(fields)
+
+    def wait(self, timeout=None):
+        # True once the job has finished (done or failed)
+        return self._finished.wait(timeout)
+
+    def snapshot(self):
+        with self._lock:
+            state = dict(self._state)
+            state["stage_seconds"] = dict(state["stage_seconds"])
+            return state
+
+
+class IngestionQueue:
+    """Runs ingestion jobs on a background worker pool and tracks their progress."""
+
+    def __init__(self, workers=2, keep_finished=100):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.keep_finished = keep_finished
+
+    def submit(self, pdf_name, run):
+        # run(job) does the work and returns the ingestion report
+        job = IngestionJob(pdf_name)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._pool.submit(self._run, job, run)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, run):
+        job.update(status="running", stage="starting")
+        try:
+            report = run(job)
+            job.update(status="done", stage="done", report=report, finished=time.time())
+        except Exception as e:
+            traceback.print_exc()
+            job.update(status="failed", stage="failed", error=str(e), finished=time.time())
+        finally:
+            job._finished.set()
+
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if job.snapshot()["finished"] is not None]
+        finished.sort(key=lambda job: job.snapshot()["finished"])
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job.id]
@@ -0,0 +1,108 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how",
+    "i", "in", "is", "it", "me", "my", "of", "on", "or", "the", "to", "what", "when", "where",
+    "which", "who", "will", "with", "you", "your",
+}
+
+
+def normalise_word(word):
+    # Crude singularisation so "Booth" matches "Explore Booths"; shared with the timetable lookup
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def word_tokens(text, stop_words=frozenset()):
+    return [normalise_word(word) for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in stop_words]
+
+
+def lexical_tokens(text):
+    return word_tokens(text, STOP_WORDS)
+
+
+class BM25Index:
+    """In-memory BM25 inverted index over the chunks of one shard."""
+
+    FILE_NAME = "bm25.json"
+    VERSION = 2  # bumped whenever lexical_tokens changes, so older files are rebuilt
+
+    def __init__(self, ids, postings, doc_lengths, k1=1.5, b=0.75):
+        self.ids = ids
+        self.postings = postings  # term -> [[doc position, term frequency], ...]
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.avg_length = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0
+
+    @classmethod
+    def build(cls, items):
+        # items: iterable of (chunk id, text)
+        ids, postings, doc_lengths = [], {}, []
+        for position, (chunk_id, text) in enumerate(items):
+            tokens = lexical_tokens(text)
+            ids.append(chunk_id)
+            doc_lengths.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                postings.setdefault(term, []).append([position, count])
+        return cls(ids, postings, doc_lengths)
+
+    @classmethod
+    def load(cls, store_path):
+        path = os.path.join(store_path, cls.FILE_NAME)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        if data.get("version") != cls.VERSION:
+            return None
+        return cls(data["ids"], data["postings"], data["doc_lengths"])
+
+    def save(self, store_path):
+        with open(os.path.join(store_path, self.FILE_NAME), "w", encoding="utf-8") as file:
+            json.dump({"version": self.VERSION, "ids": self.ids, "postings": self.postings,
+                       "doc_lengths": self.doc_lengths}, file)
+
+    def search(self, query, k=5):
+        # Returns [(chunk id, score, fraction of query terms the chunk contains)]
+        terms = set(lexical_tokens(query))
+        if not terms or not self.ids:
+            return []
+        scores, matched = Counter(), Counter()
+        n = len(self.ids)
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[position] / (self.avg_length or 1))
+                scores[position] += idf * tf * (self.k1 + 1) / (tf + norm)
+                matched[position] += 1
+        return [(self.ids[position], score, matched[position] / len(terms))
+                for position, score in scores.most_common(k)]
+
+
+def merge_by_rank(rankings):
+    # rankings: one [(key, score), ...] list per shard, best first. BM25 scores depend on each
+    # shard's own statistics, so shards are interleaved by rank rather than compared by score;
+    # ties at the same rank go to the hit closer to its shard's best score.
+    merged = []
+    for ranking in rankings:
+        best = ranking[0][1] if ranking and ranking[0][1] > 0 else 1.0
+        merged.extend((rank, -score / best, key) for rank, (key, score) in enumerate(ranking))
+    return [key for _, _, key in sorted(merged, key=lambda entry: entry[:2])]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    # rankings: lists of keys, best first; returns keys ordered by fused score
+    fused = Counter()
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            fused[key] += 1.0 / (k + rank + 1)
+    return [key for key, _ in fused.most_common()]
@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import json
+import uuid
 
 # Streamlit UI
 st.set_page_config(page_title="Chatbot", page_icon="🤖", layout="wide")
@@ -25,6 +26,9 @@ if "language" not in st.session_state:
     st.session_state.language = "English"
 if "messages" not in st.session_state:
     st.session_state.messages = []
+# The backend keeps the conversation history for this id, so follow-up questions work
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
 # Load translations
 translations = load_translations()
@@ -36,6 +40,19 @@ def get_text(key):
         lang = "English"
     return translations[lang].get(key, f"Missing translation: {key}")
 
+# Common questions and their precomputed answers, in the selected language
+@st.cache_data(ttl=300)
+def load_faq(language):
+    try:
+        response = requests.get("http://127.0.0.1:5000/faq", params={"language": language}, timeout=60)
+        response.raise_for_status()
+        faqs = {}
+        for item in response.json().get("faqs", []):
+            faqs.setdefault(item["canonical"], item)  # the same question may be asked of several documents
+        return list(faqs.values())
+    except (requests.exceptions.RequestException, ValueError):
+        return []
+
 # Sidebar Information
 with st.sidebar:
     st.markdown('<div class="sidebar-content">', unsafe_allow_html=True)
@@ -60,6 +77,12 @@ with st.sidebar:
     st.markdown('<div class="history-section">', unsafe_allow_html=True)
     st.markdown(f"### {get_text('chat_history')}")
     st.markdown('</div>', unsafe_allow_html=True)
+
+    # Common questions can be picked without typing; the backend answers them from its FAQ store
+    st.markdown(f"### {get_text('common_questions')}")
+    for item in load_faq(st.session_state.language):
+        if st.button(item["question"], key=f"faq-{item['canonical']}"):
+            st.session_state.faq_pick = item
     
     # Bottom Controls
     st.markdown('<div class="bottom-controls">', unsafe_allow_html=True)
@@ -100,29 +123,62 @@ with st.sidebar:
 #     with st.chat_message("assistant"):
 #         st.markdown(response)
 
-# User input
-if user_input := st.chat_input(get_text("chat_placeholder")):
+# Parse a Server-Sent Events response into (event, payload) pairs
+def read_events(response):
+    event = "message"
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            event = "message"
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            yield event, json.loads(line[len("data:"):].strip())
+
+# User input, typed or picked from the common questions (sent in its canonical form)
+typed = st.chat_input(get_text("chat_placeholder"))
+picked = st.session_state.pop("faq_pick", None)
+if typed or picked:
+    user_input = typed or picked["question"]
+    message = typed or picked["canonical"]
     st.session_state.messages.append({"role": "user", "content": user_input})
     with st.chat_message(get_text("user")):
         st.markdown(user_input)
 
-    try:
-        response = requests.post(
-            "http://127.0.0.1:5000/chat",
-            json={
-                "message": user_input,
-                "language": st.session_state.language
-            }
-        )
-        response.raise_for_status()
-        data = response.json()
-        chatbot_response = data.get("response", get_text("no_results"))
-    except requests.exceptions.RequestException as e:
-        chatbot_response = f"{get_text('error')} {str(e)}"
-    except requests.exceptions.JSONDecodeError:
-        chatbot_response = f"{get_text('error')} Received non-JSON response"
-
-    st.session_state.messages.append({"role": "assistant", "content": chatbot_response})
+    # Stream the answer from the backend and render it as tokens arrive
     with st.chat_message(get_text("assistant")):
+        placeholder = st.empty()
+        placeholder.markdown(get_text("ai_thinking"))
+        chatbot_response = ""
+        try:
+            response = requests.post(
+                "http://127.0.0.1:5000/chat_stream",
+                json={
+                    "message": message,
+                    "language": st.session_state.language,
+                    "session_id": st.session_state.session_id,
+                    # A picked question is already in its canonical form, so the backend skips translating it
+                    "faq": not typed
+                },
+                stream=True
+            )
+            # 429/503: the backend is shedding load or still starting, so show its message rather than an HTTP error
+            if response.status_code in (429, 503):
+                chatbot_response = response.json().get("response", get_text("error"))
+            else:
+                response.raise_for_status()
+                for event, payload in read_events(response):
+                    if event == "token":
+                        chatbot_response += payload.get("token", "")
+                        placeholder.markdown(chatbot_response + "▌")
+                    elif event == "reset":
+                        chatbot_response = ""
+                        placeholder.markdown(get_text("ai_thinking"))
+            if not chatbot_response:
+                chatbot_response = get_text("no_results")
+        except ValueError:
+            chatbot_response = f"{get_text('error')} Received non-JSON response"
+        except requests.exceptions.RequestException as e:
+            chatbot_response = f"{get_text('error')} {str(e)}"
+        placeholder.markdown(chatbot_response)
 
-        st.markdown(chatbot_response)
\ No newline at end of file
+    st.session_state.messages.append({"role": "assistant", "content": chatbot_response})
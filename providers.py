@@ -0,0 +1,111 @@
+import hashlib
+import math
+import os
+import re
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+# Provider seams: EMBEDDING_PROVIDER / LLM_PROVIDER select "google" (default) or
+# "fake", a deterministic local stand-in for offline benchmarking and load tests.
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic hashed bag-of-words vectors with a configurable call latency."""
+
+    def __init__(self, dim=768, latency=0.0):
+        self.dim = dim
+        self.latency = latency
+
+    def _vector(self, text):
+        vector = [0.0] * self.dim
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        for feature in words + [a + " " + b for a, b in zip(words, words[1:])]:
+            digest = hashlib.md5(feature.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._vector(text)
+
+
+class FakeLLM(LLM):
+    """Local LLM stand-in with configurable time-to-first-token and token rate.
+
+    Answers are words lifted from the prompt at a position derived from its
+    hash, so the same prompt always produces the same answer.
+    """
+
+    latency: float = 0.3
+    tokens_per_second: float = 50.0
+    answer_tokens: int = 40
+    negative_rate: float = 0.0  # share of grounded answers that report "not found"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _tokens(self, prompt):
+        digest = int(hashlib.md5(prompt.encode("utf-8")).hexdigest(), 16)
+        if "general knowledge" not in prompt and (digest % 1000) < self.negative_rate * 1000:
+            words = "The text does not provide that information.".split()
+        else:
+            words = prompt.split()
+            start = digest % max(1, len(words) - self.answer_tokens)
+            words = words[start:start + self.answer_tokens]
+
+        time.sleep(self.latency)
+        for i, word in enumerate(words):
+            if self.tokens_per_second:
+                time.sleep(1.0 / self.tokens_per_second)
+            yield word if i == 0 else " " + word
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        return "".join(self._tokens(prompt))
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None,
+                **kwargs: Any) -> Iterator[GenerationChunk]:
+        for token in self._tokens(prompt):
+            chunk = GenerationChunk(text=token)
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def make_embeddings(model, api_key):
+    if os.getenv("EMBEDDING_PROVIDER", "google") == "fake":
+        return FakeEmbeddings(
+            dim=int(os.getenv("FAKE_EMBEDDING_DIM", "768")),
+            latency=float(os.getenv("FAKE_EMBEDDING_LATENCY_MS", "0")) / 1000,
+        )
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    return GoogleGenerativeAIEmbeddings(model=model, google_api_key=api_key)
+
+
+def embedding_model_name(model):
+    # Keeps fake vectors out of the embedding cache entries of the real model
+    return "fake-hashed" if os.getenv("EMBEDDING_PROVIDER", "google") == "fake" else model
+
+
+def make_llm(model, api_key, temperature):
+    if os.getenv("LLM_PROVIDER", "google") == "fake":
+        return FakeLLM(
+            latency=float(os.getenv("FAKE_LLM_LATENCY_MS", "300")) / 1000,
+            tokens_per_second=float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "50")),
+            answer_tokens=int(os.getenv("FAKE_LLM_ANSWER_TOKENS", "40")),
+            negative_rate=float(os.getenv("FAKE_LLM_NEGATIVE_RATE", "0")),
+        )
+    from langchain_google_genai import GoogleGenerativeAI
+    return GoogleGenerativeAI(model=model, temperature=temperature, google_api_key=api_key)
@@ -0,0 +1,65 @@
+"""Rebuild vector store snapshots with another index type.
+
+    python rebuild_index.py --type float16
+    python rebuild_index.py --type ivfpq --param nlist=256 --param m=32 vector_stores/handbook
+
+With no store paths every snapshot under vector_stores/ is rebuilt. Chunks,
+vectors and the BM25 index are kept; only the vector index changes. A running
+backend keeps searching the stores it has open with their old index, and opens
+the rebuilt ones when it next loads them (after an eviction or a restart).
+Use benchmarks/index_report.py to compare the index types first.
+"""
+import argparse
+import os
+import sys
+
+from snapshot_store import SnapshotStore, rebuild_snapshot
+from vector_index import INDEX_TYPES
+
+VECTOR_STORE_FOLDER = "vector_stores"
+
+
+def parse_params(pairs):
+    params = {}
+    for pair in pairs:
+        key, _, value = pair.partition("=")
+        if not value:
+            raise SystemExit(f"--param expects key=value, got {pair!r}")
+        params[key] = int(value)
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild vector store snapshots with another index type.")
+    parser.add_argument("stores", nargs="*", help="Store directories; default all under vector_stores/")
+    parser.add_argument("--type", required=True, choices=INDEX_TYPES)
+    parser.add_argument("--param", action="append", default=[], help="Index parameter as key=value (repeatable)")
+    args = parser.parse_args()
+
+    params = parse_params(args.param)
+    stores = args.stores or sorted(
+        os.path.join(VECTOR_STORE_FOLDER, name) for name in os.listdir(VECTOR_STORE_FOLDER)
+        if os.path.isdir(os.path.join(VECTOR_STORE_FOLDER, name)) and not name.endswith((".tmp", ".old"))
+    )
+
+    failed = False
+    for store_path in stores:
+        snapshot = SnapshotStore.open(store_path)
+        if snapshot is None:
+            # Old pickle-format stores are converted by re-ingesting their PDF (the backend does this on boot)
+            print(f"{store_path}: no snapshot, skipped")
+            continue
+        before = snapshot.index_type
+        try:
+            manifest = rebuild_snapshot(store_path, args.type, params)
+        except ValueError as e:
+            print(f"{store_path}: {e}")
+            failed = True
+            continue
+        index = dict(manifest["index"])
+        print(f"{store_path}: {before} -> {index.pop('type')} {index or ''} ({manifest['count']} vectors)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+
+from vector_index import FAISS_TYPES, ExactIndex, FaissIndex, build_index, resolve_params
+
+# On-disk snapshot of one index shard, readable without unpickling anything:
+#   manifest.json  format version, embedding model, dimensions, index type and content hashes
+#   vectors.npy    float32 matrix, one row per chunk, memory-mapped on open; kept for every index
+#                  type so a store can be rebuilt into another one
+#   vectors.f16.npy  half-precision copy searched by float16 stores
+#   index.faiss    trained IVF/PQ index, for those index types only
+#   ids.json       chunk ids (content hashes) in row order
+#   chunks.jsonl   one {"text", "metadata"} record per row, read on demand
+#   offsets.npy    byte offset of every record in chunks.jsonl, plus the end offset
+SNAPSHOT_FORMAT = "chatbot-snapshot"
+SNAPSHOT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+FLOAT16_FILE = "vectors.f16.npy"
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_hash(ids):
+    # Chunk ids are content hashes, so this identifies the set of chunks in a shard
+    return hashlib.sha256("\n".join(sorted(ids)).encode("utf-8")).hexdigest()
+
+
+def read_manifest(store_path):
+    path = os.path.join(store_path, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+    if manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("version") != SNAPSHOT_VERSION:
+        return None
+    return manifest
+
+
+def write_snapshot(store_path, ids, vectors, texts, metadatas, model, source_hash=None,
+                   index_type="flat", index_params=None):
+    os.makedirs(store_path, exist_ok=True)
+    params = resolve_params(index_type, index_params)
+    vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1) if len(ids) else np.zeros((0, 0), np.float32)
+    np.save(os.path.join(store_path, "vectors.npy"), vectors)
+    if index_type == "float16":
+        np.save(os.path.join(store_path, FLOAT16_FILE), vectors.astype(np.float16))
+    elif index_type in FAISS_TYPES and len(ids):
+        index = build_index(vectors, index_type, params)
+        index.save(store_path)
+        params = index.params
+
+    offsets = [0]
+    with open(os.path.join(store_path, "chunks.jsonl"), "wb") as file:
+        for text, metadata in zip(texts, metadatas):
+            line = json.dumps({"text": text, "metadata": metadata}, ensure_ascii=False).encode("utf-8") + b"\n"
+            file.write(line)
+            offsets.append(offsets[-1] + len(line))
+    np.save(os.path.join(store_path, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+
+    with open(os.path.join(store_path, "ids.json"), "w", encoding="utf-8") as file:
+        json.dump(list(ids), file)
+
+    # The manifest is written last: a directory without one is not a snapshot
+    with open(os.path.join(store_path, MANIFEST_FILE), "w", encoding="utf-8") as file:
+        json.dump({
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "model": model,
+            "dim": int(vectors.shape[1]) if len(ids) else 0,
+            "count": len(ids),
+            "metric": "l2",
+            "index": dict(params, type=index_type),
+            "content_hash": content_hash(ids),
+            "source_hash": source_hash,
+        }, file, indent=2)
+
+
+class SnapshotStore:
+    """Read-only view of a snapshot: vectors are memory-mapped, chunk texts read on demand.
+
+    Every file is opened when the store is, so a store keeps reading the snapshot it was
+    opened on even after a newer one is swapped into its directory.
+    """
+
+    def __init__(self, store_path, manifest):
+        self.store_path = store_path
+        self.manifest = manifest
+        self.vectors = np.load(os.path.join(store_path, "vectors.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(store_path, "offsets.npy"), mmap_mode="r")
+        with open(os.path.join(store_path, "ids.json"), "r", encoding="utf-8") as file:
+            self.ids = json.load(file)
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        with open(os.path.join(store_path, "chunks.jsonl"), "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            self._chunks = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        float16_path = os.path.join(store_path, FLOAT16_FILE)
+        if self.index_type in FAISS_TYPES and self.ids:
+            self._index = FaissIndex.load(store_path, self.index_params)
+        elif self.index_type == "float16" and os.path.exists(float16_path):
+            self._index = ExactIndex(np.load(float16_path, mmap_mode="r"))
+        else:
+            # Also float16 stores written before the float32 vectors were kept
+            self._index = ExactIndex(self.vectors)
+
+    @classmethod
+    def open(cls, store_path, attempts=3):
+        # None when the directory holds no (supported) snapshot. A swap between reading the
+        # manifest and opening the files is detected by re-reading the manifest, and retried.
+        for _ in range(attempts):
+            manifest = read_manifest(store_path)
+            if manifest is None:
+                return None
+            try:
+                store = cls(store_path, manifest)
+            except (OSError, ValueError, RuntimeError):
+                continue
+            if read_manifest(store_path) == manifest and len(store.ids) + 1 == len(store.offsets):
+                return store
+        return None
+
+    @property
+    def index_type(self):
+        return self.manifest.get("index", {}).get("type", "flat")
+
+    @property
+    def index_params(self):
+        return {key: value for key, value in self.manifest.get("index", {}).items() if key != "type"}
+
+    @property
+    def nbytes(self):
+        # Bytes a search reads: the index, plus the offsets. The full vectors and chunk texts
+        # are only read a row at a time, so a PQ store costs far less than its directory.
+        return self._index.nbytes + self.offsets.nbytes
+
+    def is_current(self, model, source_hash, index_type=None):
+        return (self.manifest.get("model") == model and self.manifest.get("source_hash") == source_hash
+                and (index_type is None or index_type == self.index_type))
+
+    def vector(self, chunk_id):
+        return np.array(self.vectors[self._rows[chunk_id]], dtype=np.float32)
+
+    def all_vectors(self):
+        return np.asarray(self.vectors, dtype=np.float32)
+
+    def records(self):
+        # (chunk id, text, metadata) for every chunk, in row order
+        for chunk_id in self.ids:
+            document = self.document(chunk_id)
+            yield chunk_id, document.page_content, document.metadata
+
+    def document(self, chunk_id):
+        row = self._rows.get(chunk_id)
+        if row is None:
+            return None
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        record = json.loads(self._chunks[start:end])
+        return Document(page_content=record["text"], metadata=record["metadata"])
+
+    def items(self):
+        # (chunk id, text) for every chunk, e.g. to build the BM25 index
+        for chunk_id in self.ids:
+            yield chunk_id, self.document(chunk_id).page_content
+
+    def search(self, query_vector, k=5):
+        # Squared-L2 search (the metric FAISS IndexFlatL2 used): exact over the mapped rows,
+        # or approximate through the trained index for IVF/PQ stores
+        if not self.ids:
+            return []
+        distances, rows = self._index.search(query_vector, k)
+        return [(self.document(self.ids[row]), float(distance)) for distance, row in zip(distances, rows)]
+
+
+def temporary_path(store_path):
+    # A sibling directory unique to one write, so concurrent writers never share it
+    return f"{store_path}.{uuid.uuid4().hex}.tmp"
+
+
+def swap_directory(tmp_path, store_path):
+    # Move a fully written directory into place, so readers never see a half-written index.
+    # Stores already open keep their mapped files, which stay readable after removal.
+    old_path = f"{store_path}.{uuid.uuid4().hex}.old"
+    if os.path.exists(store_path):
+        os.rename(store_path, old_path)
+    os.rename(tmp_path, store_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def rebuild_snapshot(store_path, index_type, params=None):
+    # Rewrite an existing snapshot with another index type; chunks and BM25 index are kept
+    snapshot = SnapshotStore.open(store_path)
+    if snapshot is None:
+        raise ValueError(f"{store_path} holds no snapshot")
+    if snapshot.vectors.dtype != np.float32:
+        # Older float16 stores kept only the half-precision vectors; re-ingest the PDF instead
+        raise ValueError(f"{store_path} holds float16 vectors only; re-ingest its PDF to change the index type")
+    records = list(snapshot.records())
+    tmp_path = temporary_path(store_path)
+    write_snapshot(
+        tmp_path,
+        ids=[chunk_id for chunk_id, _, _ in records],
+        vectors=snapshot.all_vectors(),
+        texts=[text for _, text, _ in records],
+        metadatas=[metadata for _, _, metadata in records],
+        model=snapshot.manifest.get("model"),
+        source_hash=snapshot.manifest.get("source_hash"),
+        index_type=index_type,
+        index_params=params,
+    )
+    for name in os.listdir(store_path):
+        # Files that belong to other layers (e.g. bm25.json) move across unchanged
+        if not os.path.exists(os.path.join(tmp_path, name)) and name not in (FaissIndex.FILE_NAME, FLOAT16_FILE):
+            shutil.copy2(os.path.join(store_path, name), os.path.join(tmp_path, name))
+    swap_directory(tmp_path, store_path)
+    return read_manifest(store_path)
@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+
+
+class VectorStoreRegistry:
+    """Process-wide cache of loaded vector stores with LRU eviction."""
+
+    def __init__(self, max_entries=8, max_bytes=0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes  # 0 disables the memory budget
+        self._entries = OrderedDict()  # key -> (store, size)
+        self._lock = threading.RLock()
+        self._loading = {}  # key -> lock held while the key is being loaded
+        self._generations = {}  # key -> bumped on every invalidate/put
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, loader):
+        # Fast path: already resident
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+            generation = self._generations.get(key, 0)
+
+        # Only one thread loads a given key; the others wait and reuse it
+        with key_lock:
+            try:
+                with self._lock:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return self._entries[key][0]
+                    self.misses += 1
+
+                store, size = loader()
+                if store is None:
+                    return None
+
+                with self._lock:
+                    # Drop the result if the key was invalidated while loading
+                    if self._generations.get(key, 0) == generation:
+                        self._insert(key, store, size)
+                return store
+            finally:
+                # Missing or invalidated keys must not leave their lock behind
+                with self._lock:
+                    if self._loading.get(key) is key_lock:
+                        del self._loading[key]
+
+    def put(self, key, store, size=0):
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.pop(key, None)
+            self._insert(key, store, size)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.pop(key, None)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(size for _, size in self._entries.values()),
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _insert(self, key, store, size):
+        self._entries[key] = (store, size)
+        self._entries.move_to_end(key)
+        self._evict(keep=key)
+
+    def _evict(self, keep):
+        def over_budget():
+            if self.max_entries and len(self._entries) > self.max_entries:
+                return True
+            if self.max_bytes:
+                return sum(size for _, size in self._entries.values()) > self.max_bytes
+            return False
+
+        while over_budget() and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            self._entries.pop(oldest)
+            self.evictions += 1
@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+# The modules under test live at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# backend.py is configured at import time: no warm-up, local stand-ins for the Google APIs
+BACKEND_ENV = {
+    "WARM_UP": "0",
+    "EMBEDDING_PROVIDER": "fake",
+    "LLM_PROVIDER": "fake",
+    "FAKE_EMBEDDING_DIM": "64",
+    "FAKE_LLM_LATENCY_MS": "0",
+    "FAKE_LLM_TOKENS_PER_SECOND": "0",
+    "INGEST_WORKERS": "1",
+}
+
+
+def write_store(store_path, texts, vectors, index_type="flat", index_params=None, source="a.pdf", source_hash="h1"):
+    # A snapshot as ingestion writes it, with chunk ids "id-<text>" and embedding model "model-a"
+    from snapshot_store import write_snapshot
+
+    write_snapshot(
+        str(store_path),
+        ids=[f"id-{text}" for text in texts],
+        vectors=vectors,
+        texts=texts,
+        metadatas=[{"source": source} for _ in texts],
+        model="model-a",
+        source_hash=source_hash,
+        index_type=index_type,
+        index_params=index_params,
+    )
+
+
+@pytest.fixture(scope="session")
+def backend_workdir(tmp_path_factory):
+    # backend.py works on paths relative to the working directory
+    return tmp_path_factory.mktemp("backend")
+
+
+@pytest.fixture
+def backend(backend_workdir, monkeypatch):
+    pytest.importorskip("flask")
+    pytest.importorskip("langchain")
+    for key, value in BACKEND_ENV.items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.chdir(backend_workdir)
+    import backend
+    return backend
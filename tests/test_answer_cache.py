@@ -0,0 +1,36 @@
+from answer_cache import SemanticAnswerCache
+
+
+def test_similar_question_in_same_scope_hits():
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.store([1.0, 0.0], "a.pdf", "answer")
+    assert cache.lookup([0.99, 0.01], "a.pdf") == "answer"
+    assert cache.lookup([0.0, 1.0], "a.pdf") is None
+    assert cache.lookup([1.0, 0.0], "b.pdf") is None
+
+
+def test_invalidate_drops_document_and_all_document_answers():
+    cache = SemanticAnswerCache()
+    cache.store([1.0, 0.0], "a.pdf", "a")
+    cache.store([1.0, 0.0], "*", "all")
+    cache.store([1.0, 0.0], "b.pdf", "b")
+    cache.invalidate("a.pdf")
+    assert cache.lookup([1.0, 0.0], "a.pdf") is None
+    assert cache.lookup([1.0, 0.0], "*") is None
+    assert cache.lookup([1.0, 0.0], "b.pdf") == "b"
+
+
+def test_answer_computed_before_invalidation_is_not_stored():
+    cache = SemanticAnswerCache()
+    version = cache.version("a.pdf")
+    cache.invalidate("a.pdf")
+    cache.store([1.0, 0.0], "a.pdf", "stale", version)
+    assert cache.lookup([1.0, 0.0], "a.pdf") is None
+
+
+def test_max_entries_evicts_oldest():
+    cache = SemanticAnswerCache(max_entries=1)
+    cache.store([1.0, 0.0], "a.pdf", "first")
+    cache.store([0.0, 1.0], "a.pdf", "second")
+    assert cache.stats()["entries"] == 1
+    assert cache.lookup([1.0, 0.0], "a.pdf") is None
@@ -0,0 +1,48 @@
+import asyncio
+import threading
+import time
+
+from async_service import AsyncChatService, normalise_question
+
+
+def test_normalise_question_ignores_case_spacing_and_punctuation():
+    assert normalise_question("  Where is the Explore Booth?? ") == normalise_question("where is the explore booth")
+
+
+def test_identical_in_flight_questions_share_one_computation():
+    service = AsyncChatService(max_concurrency=2)
+    release = threading.Event()
+    calls = []
+
+    async def answer():
+        calls.append(1)
+        await asyncio.get_running_loop().run_in_executor(None, release.wait)
+        return "answer"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.run("q", answer))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while service.stats()["coalesced"] < 2:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["answer"] * 3
+    assert len(calls) == 1
+    assert service.stats()["in_flight"] == 0
+
+
+def test_upstream_bounds_concurrency():
+    service = AsyncChatService(max_concurrency=2)
+    peak = []
+
+    async def call():
+        peak.append(service.active_upstream)
+        await asyncio.sleep(0.01)
+
+    async def run_all():
+        await asyncio.gather(*(service.upstream(call()) for _ in range(6)))
+
+    asyncio.run_coroutine_threadsafe(run_all(), service.loop).result(5)
+    assert max(peak) <= 2
@@ -0,0 +1,121 @@
+import os
+import re
+import threading
+
+from conftest import ROOT, write_store
+from faq import save_faq
+
+PDF = os.path.join(ROOT, "uploaded_pdfs", "TR1S-Full-Time-Orientation-Schedule.pdf")
+
+
+def test_delete_drops_an_upload_queued_before_it(backend):
+    client = backend.app.test_client()
+    # Hold the only ingestion worker so the upload stays queued
+    release = threading.Event()
+    blocker = backend.ingestion_queue.submit("blocker", lambda job: release.wait())
+    try:
+        with open(PDF, "rb") as f:
+            upload = client.post("/upload", data={"file": (f, "queued.pdf")})
+        assert upload.status_code == 202
+        assert client.post("/delete_pdf", json={"pdf_name": "queued.pdf"}).status_code == 200
+    finally:
+        release.set()
+    blocker.wait()
+
+    job = backend.ingestion_queue.get(upload.json["job_id"])
+    assert job.wait(10)
+    assert job.snapshot()["status"] == "done" and job.snapshot()["report"] is None
+    assert not os.path.exists(os.path.join(backend.UPLOAD_FOLDER, "queued.pdf"))
+    assert not os.path.exists(backend.store_path_for("queued.pdf"))
+    assert not [name for name in os.listdir(backend.UPLOAD_FOLDER) if name.endswith(".upload")]
+
+
+def test_self_contained_questions_in_a_session_use_the_answer_cache(backend):
+    client = backend.app.test_client()
+    conversation = backend.conversations.get("cache-session")
+    conversation.add_turn("Hi", "Hi", "Hello!")
+    question = "Where is the Explore Booth?"
+    scope = backend.cache_scope("session.pdf")
+    backend.answer_cache.store(backend.embed_query(question), scope, "Block E.", backend.answer_cache.version(scope))
+
+    response = client.post("/chat", json={"message": question, "pdf_name": "session.pdf",
+                                          "session_id": "cache-session"})
+    assert response.json == {"response": "Block E.", "cached": True}
+    assert conversation.version == 2
+
+
+def test_picked_faq_questions_are_matched_without_translating_them(backend, monkeypatch):
+    client = backend.app.test_client()
+    entries = [{"question": "What documents do I need?", "answer": "Your passport.", "source": "faq.pdf"}]
+    save_faq(backend.faq_path_for("faq.pdf"), "faq.pdf", "h1", backend.LLM_MODEL, entries)
+    backend.invalidate_faq("faq.pdf")
+    translations = []
+
+    def translate(text, source, target):
+        translations.append((text, source, target))
+        return f"[{target}] {text}"
+
+    monkeypatch.setattr(backend, "translate", translate)
+    response = client.post("/chat", json={"message": "What documents do I need?", "pdf_name": "faq.pdf",
+                                          "faq": True, "language": "zh"})
+    assert response.json == {"response": "[Chinese (Simplified)] Your passport.", "source": "faq"}
+    assert translations == [("Your passport.", backend.PIVOT_LANGUAGE, "Chinese (Simplified)")]
+
+
+def test_search_merges_hits_from_every_shard(backend, monkeypatch):
+    shards = {
+        "merge-a.pdf": ["Explore Booth explore booth explore booth in Block E.", "The library opens at 8am."],
+        "merge-b.pdf": ["Bring your passport to the Explore Booth.", "Parking is behind Block C."],
+    }
+    for pdf_name, texts in shards.items():
+        write_store(backend.store_path_for(pdf_name), texts, [backend.embed_query(text) for text in texts],
+                    source=pdf_name)
+        backend.store_registry.invalidate(backend.store_path_for(pdf_name))
+    monkeypatch.setattr(backend, "list_shards", lambda: [backend.store_path_for(name) for name in shards])
+
+    # BM25 scores differ in scale between shards, so each shard's best lexical hit makes the top two
+    lexical = backend.search_shards("explore booth", None, k=2)
+    assert {doc.metadata["source"] for doc in lexical} == set(shards)
+
+    # With a query vector the nearest chunk ranks first, whichever shard holds it
+    query = "Parking is behind Block C."
+    docs = backend.search_shards(query, backend.embed_query(query), k=3)
+    assert docs[0].page_content == query
+    assert len({doc.page_content for doc in docs}) == 3
+
+
+def test_metrics_endpoint_uses_the_prometheus_text_format(backend):
+    client = backend.app.test_client()
+    client.get("/list_pdfs")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain" and "version=0.0.4" in response.content_type
+
+    described = set()
+    sample = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{([a-zA-Z_]+="[^"]*",?)*\})? -?[0-9.e+-]+$')
+    for line in response.get_data(as_text=True).splitlines():
+        if line.startswith("# HELP "):
+            described.add(line.split()[2])
+        elif line.startswith("# TYPE "):
+            assert line.split()[3] in ("counter", "gauge", "histogram")
+        else:
+            match = sample.match(line)
+            assert match, line
+            name = match.group(1)
+            assert name in described or re.sub(r"_(bucket|sum|count)$", "", name) in described, line
+    assert {"chatbot_stage_seconds", "chatbot_chat_requests_total", "chatbot_upstream_queue_depth"} <= described
+
+
+def test_only_documents_without_a_snapshot_wait_for_start_up(backend, monkeypatch):
+    client = backend.app.test_client()
+    release = threading.Event()
+    job = backend.ingestion_queue.submit("new.pdf", lambda job: release.wait())
+    monkeypatch.setitem(backend.unbuilt, "new.pdf", job)
+
+    response = client.post("/chat", json={"message": "Where is the Explore Booth?", "pdf_name": "new.pdf"})
+    assert response.status_code == 503 and response.headers["Retry-After"] == str(backend.WARM_UP_RETRY_AFTER)
+    assert not backend.waiting_for_index("stream.pdf")
+    ready = client.get("/ready")
+    release.set()
+    assert ready.status_code == 200 and ready.json["building"] == ["new.pdf"]
+    assert job.wait(10) and not backend.waiting_for_index("new.pdf")
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from conftest import write_store
+from fallback import SEQUENTIAL, VERDICT
+
+PDF_NAME = "stream.pdf"
+CHUNKS = ["The Explore Booth is in Block E.", "JCU 101 starts at 10:40 AM in the Multi-Purpose Hall."]
+
+
+@pytest.fixture
+def client(backend):
+    # One shard for the stream tests, with an empty answer cache
+    write_store(backend.store_path_for(PDF_NAME), CHUNKS, [backend.embed_query(text) for text in CHUNKS],
+                source=PDF_NAME)
+    backend.store_registry.invalidate(backend.store_path_for(PDF_NAME))
+    backend.answer_cache.invalidate(backend.cache_scope(PDF_NAME))
+    return backend.app.test_client()
+
+
+def scripted(monkeypatch, backend, *replies):
+    # stream_llm returns the given token lists, one per call
+    prompts = []
+
+    def stream_llm(prompt):
+        prompts.append(prompt)
+        return iter(replies[len(prompts) - 1])
+
+    monkeypatch.setattr(backend, "stream_llm", stream_llm)
+    return prompts
+
+
+def events(response):
+    parsed = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        if block:
+            event, data = block.split("\n", 1)
+            parsed.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return parsed
+
+
+def tokens(parsed):
+    return [payload["token"] for event, payload in parsed if event == "token" and payload["token"]]
+
+
+def ask(client, question):
+    return events(client.post("/chat_stream", json={"message": question, "pdf_name": PDF_NAME}))
+
+
+def test_not_answered_verdict_streams_only_the_fallback_answer(client, backend, monkeypatch):
+    monkeypatch.setattr(backend, "FALLBACK_STRATEGY", VERDICT)
+    scripted(monkeypatch, backend, ["NOT", " ANSWERED:", " Ask", " Student", " Services."])
+    fallbacks = backend.fallback_telemetry.stats()["fallbacks"]
+
+    parsed = ask(client, "Is there a shuttle bus to the Explore Booth?")
+    assert "".join(tokens(parsed)).strip() == "Ask Student Services."
+    assert not any("ANSWERED" in token for token in tokens(parsed))
+    assert parsed[-1] == ("done", {"cached": False})
+    assert backend.fallback_telemetry.stats()["fallbacks"] == fallbacks + 1
+
+
+def test_negative_grounded_answer_is_reset_and_replaced(client, backend, monkeypatch):
+    monkeypatch.setattr(backend, "FALLBACK_STRATEGY", SEQUENTIAL)
+    prompts = scripted(monkeypatch, backend, ["The text", " does not provide", " that."], ["Try", " the", " library."])
+
+    parsed = ask(client, "Where can I print documents?")
+    assert [event for event, _ in parsed] == ["token"] * 3 + ["reset"] + ["token"] * 3 + ["done"]
+    assert "".join(tokens(parsed[4:])) == "Try the library."
+    assert "general knowledge" in prompts[1]
+
+
+def test_answer_tokens_stream_in_order_and_fill_the_cache(client, backend, monkeypatch):
+    monkeypatch.setattr(backend, "FALLBACK_STRATEGY", VERDICT)
+    scripted(monkeypatch, backend, ["ANSWERED:", " Block", " E", " of", " the", " campus."])
+
+    parsed = ask(client, "Which block is the Explore Booth in?")
+    assert tokens(parsed) == [" Block", " E", " of", " the", " campus."]
+    assert parsed[-1] == ("done", {"cached": False})
+
+    # The same question again is a cache hit, sent as one token without calling the model
+    scripted(monkeypatch, backend)
+    parsed = ask(client, "Which block is the Explore Booth in?")
+    assert tokens(parsed) == [" Block E of the campus."]
+    assert parsed[-1] == ("done", {"cached": True, "source": None})
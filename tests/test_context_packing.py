@@ -0,0 +1,45 @@
+from langchain_core.documents import Document
+
+from context_packing import ContextPacker, drop_near_duplicates, join_chunks, merge_overlapping
+
+SHARED = "students collect their ID cards from the service desk in Block A "
+
+
+def doc(text, source="a.pdf"):
+    return Document(page_content=text, metadata={"source": source})
+
+
+def test_join_chunks_stitches_the_splitter_overlap():
+    assert join_chunks("Welcome to orientation. " + SHARED, SHARED + "before noon.") == (
+        "Welcome to orientation. " + SHARED + "before noon.")
+    assert join_chunks("no shared text here at all", "something else entirely") is None
+
+
+def test_overlapping_chunks_of_one_document_are_merged_at_the_better_rank():
+    docs = [doc("Campus tour at noon."), doc(SHARED + "before noon."), doc("Welcome. " + SHARED),
+            doc("Welcome. " + SHARED, source="b.pdf")]
+    merged = merge_overlapping(docs)
+    assert [d.page_content for d in merged] == [
+        "Campus tour at noon.", "Welcome. " + SHARED + "before noon.", "Welcome. " + SHARED]
+    assert merged[2].metadata["source"] == "b.pdf"
+
+
+def test_near_duplicates_are_dropped():
+    docs = [doc(SHARED + "today"), doc(SHARED + "today!"), doc("library opening hours")]
+    assert [d.page_content for d in drop_near_duplicates(docs)] == [SHARED + "today", "library opening hours"]
+
+
+def test_pack_stays_within_budget_and_always_sends_the_best_chunk():
+    packer = ContextPacker(budget=20)
+    docs = [doc("x" * 200), doc("short chunk")]
+    selected, timetable, report = packer.pack("question", docs)
+    assert [d.page_content for d in selected] == ["x" * 80]
+    assert report["tokens_out"] <= 20 and report["tokens_saved"] == report["tokens_in"] - report["tokens_out"]
+    assert packer.stats()["requests"] == 1
+
+
+def test_large_timetable_is_cut_to_the_lines_the_question_mentions():
+    timetable = "\n".join(f"{hour}:00 AM - Session {hour} - Venue: Room {hour}" for hour in range(1, 12))
+    timetable += "\n12:00 PM - Explore Booths - Venue: Block A"
+    _, kept, _ = ContextPacker(budget=100).pack("Where is the explore booth?", [], timetable)
+    assert kept == "12:00 PM - Explore Booths - Venue: Block A"
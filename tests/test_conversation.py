@@ -0,0 +1,60 @@
+from conversation import Conversation, ConversationStore, format_turn, needs_condensing
+
+
+def test_needs_condensing_only_for_follow_ups():
+    assert needs_condensing("And where is that?")
+    assert needs_condensing("what about the library")
+    assert not needs_condensing("Where is the Explore Booth?")
+
+
+def test_history_keeps_the_newest_turns_under_the_budget():
+    conversation = Conversation(history_tokens=30)
+    conversation.add_turn("q1", "first question", "a" * 40)
+    conversation.add_turn("q2", "second question", "short answer")
+    assert conversation.history() == format_turn("second question", "short answer")
+    assert conversation.version == 2
+
+
+def test_older_turns_fold_into_the_summary():
+    conversation = Conversation(history_tokens=600, recent_turns=2)
+    for i in range(3):
+        conversation.add_turn(f"q{i}", f"question {i}", f"answer {i}")
+    turns = conversation.turns_to_fold()
+    assert [standalone for _, standalone, _ in turns] == ["question 0"]
+    assert conversation.turns_to_fold() is None  # already being summarised
+
+    conversation.fold(turns, "Asked about question 0.")
+    history = conversation.history()
+    assert history.startswith("Summary of the earlier conversation: Asked about question 0.")
+    assert "question 0" not in history.split("\n", 1)[1]
+
+
+def test_store_expires_idle_sessions(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("conversation.time.time", lambda: now[0])
+    store = ConversationStore(ttl=60, max_sessions=2)
+    first = store.get("a")
+    assert store.get("a") is first
+    now[0] += 61
+    assert store.get("a") is not first
+    store.get("b")
+    store.get("c")
+    assert store.stats()["sessions"] == 2
+
+
+def test_condensed_follow_ups_are_reused_within_a_turn_only():
+    store = ConversationStore()
+    conversation = store.get("a")
+    conversation.add_turn("q1", "Where is the Explore Booth?", "Block E.")
+    store.remember_standalone(conversation, "And when?", "When is the Explore Booth open?", conversation.version)
+    assert store.standalone(conversation, "and when") == "When is the Explore Booth open?"
+
+    conversation.add_turn("And when?", "When is the Explore Booth open?", "At 9am.")
+    assert store.standalone(conversation, "And when?") is None
+    # A result for an earlier turn is not kept
+    store.remember_standalone(conversation, "And where?", "Where is it?", conversation.version - 1)
+    assert store.standalone(conversation, "And where?") is None
+
+    store.remember_standalone(conversation, "And where?", "Where is it?", conversation.version)
+    store.end("a")
+    assert store.standalone(store.get("a"), "And where?") is None
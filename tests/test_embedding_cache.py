@@ -0,0 +1,33 @@
+from embedding_cache import EmbeddingCache, chunk_hash, embed_with_cache
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def test_only_unseen_chunks_are_embedded(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), "model-a")
+    embeddings = CountingEmbeddings()
+    texts = {chunk_hash(t): t for t in ("one", "three", "seven")}
+
+    vectors, reused, embedded = embed_with_cache(cache, embeddings, texts, batch_size=2)
+    assert (reused, embedded) == (0, 3)
+    assert [len(batch) for batch in embeddings.batches] == [2, 1]
+
+    texts[chunk_hash("eleven")] = "eleven"
+    vectors, reused, embedded = embed_with_cache(cache, embeddings, texts, batch_size=2)
+    assert (reused, embedded) == (3, 1)
+    assert embeddings.batches[-1] == ["eleven"]
+    assert vectors[chunk_hash("three")] == [5.0, 1.0]
+
+
+def test_cache_is_per_model(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    EmbeddingCache(path, "model-a").put_many({"h": [1.0, 2.0]})
+    assert EmbeddingCache(path, "model-b").get_many(["h"]) == {}
+    assert EmbeddingCache(path, "model-a").get_many(["h"]) == {"h": [1.0, 2.0]}
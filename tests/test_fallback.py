@@ -0,0 +1,47 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fallback import parse_verdict, run_speculative, run_speculative_async
+
+
+def test_parse_verdict():
+    assert parse_verdict("ANSWERED: Block C.") == (True, "Block C.")
+    assert parse_verdict("  not answered: Try the library.") == (False, "Try the library.")
+    assert parse_verdict("Block C.") == (True, "Block C.")
+
+
+def test_speculative_uses_fallback_only_when_grounded_is_negative():
+    is_negative = lambda response: response == "no"
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        assert run_speculative(pool, lambda: "no", lambda: "general", is_negative)[:2] == ("general", True)
+
+        # The fallback is already running when the grounded answer arrives, so it is discarded
+        started, release = threading.Event(), threading.Event()
+        grounded = lambda: started.wait() and "yes"
+        fallback = lambda: started.set() or release.wait()
+        response, fell_back, discarded = run_speculative(pool, grounded, fallback, is_negative)
+        release.set()
+        assert (response, fell_back, discarded) == ("yes", False, True)
+
+
+def test_speculative_async_cancels_the_unused_fallback():
+    cancelled = []
+
+    async def grounded():
+        return "yes"
+
+    async def fallback():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def run():
+        result = await run_speculative_async(grounded(), fallback(), lambda response: response == "no")
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == ("yes", False, True)
+    assert cancelled == [True]
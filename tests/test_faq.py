@@ -0,0 +1,40 @@
+from faq import FaqIndex, load_faq, questions_for, reusable_answers, save_faq
+
+ENTRIES = [
+    {"question": "What documents do I need?", "answer": "Your passport and offer letter.", "source": "a.pdf"},
+    {"question": "Where is the Explore Booth?", "answer": "Block A.", "source": "a.pdf"},
+    {"question": "Is there parking on campus?", "answer": None, "source": "a.pdf"},
+]
+
+
+def test_exact_and_filler_only_differences_match():
+    index = FaqIndex(ENTRIES)
+    assert index.match("what documents do i need")["answer"] == "Your passport and offer letter."
+    assert index.match("Where is an Explore Booth?")["answer"] == "Block A."
+
+
+def test_negation_and_question_words_do_not_match():
+    index = FaqIndex(ENTRIES)
+    assert index.match("What documents do I not need?") is None
+    assert index.match("What documents don't I need?") is None
+    assert index.match("When is the Explore Booth?") is None
+
+
+def test_unanswered_questions_are_never_served():
+    index = FaqIndex(ENTRIES)
+    assert index.match("Is there parking on campus?") is None
+    assert [entry["question"] for entry in index.entries] == [ENTRIES[0]["question"], ENTRIES[1]["question"]]
+
+
+def test_answers_are_reused_only_for_the_same_document_and_model(tmp_path):
+    path = str(tmp_path / "faqs" / "a.json")
+    save_faq(path, "a.pdf", "h1", "model-a", ENTRIES)
+    faq = load_faq(path)
+    assert set(reusable_answers(faq, "h1", "model-a")) == {entry["question"] for entry in ENTRIES}
+    assert reusable_answers(faq, "h2", "model-a") == {}
+    assert reusable_answers(faq, "h1", "model-b") == {}
+
+
+def test_questions_for_merges_shared_and_document_questions():
+    config = {"*": ["Where is Block A?", "When does it start?"], "a.pdf": ["When does it start?", "Who to ask?"]}
+    assert questions_for(config, "uploads/a.pdf") == ["Where is Block A?", "When does it start?", "Who to ask?"]
@@ -0,0 +1,34 @@
+from lexical_index import BM25Index, lexical_tokens, merge_by_rank, reciprocal_rank_fusion
+from timetable import tokenize
+
+
+def test_plurals_fold_the_same_way_in_both_lookups():
+    assert lexical_tokens("Where are the Explore Booths?") == ["explore", "booth"]
+    assert tokenize("Explore Booths") == tokenize("explore booth")
+
+
+def test_bm25_matches_singular_query_against_plural_text():
+    index = BM25Index.build([("a", "Explore Booths are in Block A"), ("b", "Campus tour starts at noon")])
+    hits = index.search("Where is the explore booth?", k=2)
+    assert [(chunk_id, coverage) for chunk_id, _, coverage in hits] == [("a", 1.0)]
+
+
+def test_saved_index_round_trips_and_old_files_are_ignored(tmp_path):
+    index = BM25Index.build([("a", "library hours")])
+    index.save(str(tmp_path))
+    assert BM25Index.load(str(tmp_path)).search("library")[0][0] == "a"
+
+    (tmp_path / BM25Index.FILE_NAME).write_text('{"ids": [], "postings": {}, "doc_lengths": []}')
+    assert BM25Index.load(str(tmp_path)) is None
+
+
+def test_merge_by_rank_ignores_raw_score_scale_across_shards():
+    # Shard one's scores are much larger, but both shards' best hits come first, and the
+    # second hits are ordered by how close they are to their own shard's best
+    merged = merge_by_rank([[("a1", 40.0), ("a2", 30.0)], [("b1", 2.0), ("b2", 1.9)]])
+    assert merged == ["a1", "b1", "b2", "a2"]
+    assert merge_by_rank([[], [("c", 1.0)]]) == ["c"]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    assert reciprocal_rank_fusion([["x", "y", "z"], ["y", "z"]]) == ["y", "z", "x"]
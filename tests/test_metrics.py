@@ -0,0 +1,27 @@
+from metrics import MetricsRegistry
+
+
+def test_render_uses_the_prometheus_text_format():
+    registry = MetricsRegistry()
+    latency = registry.histogram("stage_seconds", "Stage latency", ("stage",), buckets=(0.1, 1.0))
+    requests = registry.counter("requests_total", "Requests", ("source",))
+    registry.gauge("queue_depth", "Queued calls", lambda: {("bulk",): 2, ("interactive",): None}, ("priority",))
+    latency.observe(0.05, "embed")
+    latency.observe(0.5, "embed")
+    requests.inc(3, 'say "hi"')
+
+    assert registry.render().splitlines() == [
+        "# HELP stage_seconds Stage latency",
+        "# TYPE stage_seconds histogram",
+        'stage_seconds_bucket{stage="embed",le="0.1"} 1',
+        'stage_seconds_bucket{stage="embed",le="1.0"} 2',
+        'stage_seconds_bucket{stage="embed",le="+Inf"} 2',
+        'stage_seconds_sum{stage="embed"} 0.55',
+        'stage_seconds_count{stage="embed"} 2',
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        "requests_total{source=\"say 'hi'\"} 3",
+        "# HELP queue_depth Queued calls",
+        "# TYPE queue_depth gauge",
+        'queue_depth{priority="bulk"} 2',
+    ]
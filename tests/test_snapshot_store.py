@@ -0,0 +1,52 @@
+import numpy as np
+
+from conftest import write_store
+from snapshot_store import SnapshotStore, rebuild_snapshot, swap_directory, temporary_path
+
+
+def replace(store_path, texts, vectors, index_type="flat"):
+    tmp_path = temporary_path(str(store_path))
+    write_store(tmp_path, texts, vectors, index_type)
+    swap_directory(tmp_path, str(store_path))
+
+
+def test_round_trip_and_search(tmp_path):
+    store_path = str(tmp_path / "store")
+    write_store(store_path, ["alpha", "beta", "gamma"], [[0, 0], [1, 0], [5, 5]])
+    store = SnapshotStore.open(store_path)
+    assert store.is_current("model-a", "h1") and not store.is_current("model-a", "h2")
+    assert store.document("id-beta").page_content == "beta"
+    assert store.document("id-beta").metadata == {"source": "a.pdf"}
+    hits = store.search([0.9, 0.1], k=2)
+    assert [doc.page_content for doc, _ in hits] == ["beta", "alpha"]
+    assert np.allclose(store.vector("id-gamma"), [5, 5])
+
+
+def test_missing_directory_is_not_a_snapshot(tmp_path):
+    assert SnapshotStore.open(str(tmp_path / "nothing")) is None
+
+
+def test_open_store_keeps_reading_its_own_snapshot_after_swaps(tmp_path):
+    store_path = tmp_path / "store"
+    write_store(str(store_path), ["alpha", "beta"], [[0, 0], [1, 0]])
+    store = SnapshotStore.open(str(store_path))
+
+    # Different texts at different offsets, swapped in twice so the original files are deleted
+    replace(store_path, ["a much longer first chunk", "x"], [[0, 0], [1, 0]])
+    replace(store_path, ["z"], [[2, 2]])
+
+    assert store.document("id-beta").page_content == "beta"
+    assert [doc.page_content for doc, _ in store.search([1, 0], k=1)] == ["beta"]
+    assert SnapshotStore.open(str(store_path)).document("id-z").page_content == "z"
+    assert not [p for p in tmp_path.iterdir() if p.name.endswith((".tmp", ".old"))]
+
+
+def test_rebuild_keeps_chunks_and_other_files(tmp_path):
+    store_path = str(tmp_path / "store")
+    write_store(store_path, ["alpha", "beta"], [[0, 0], [1, 0]])
+    (tmp_path / "store" / "bm25.json").write_text("{}")
+    manifest = rebuild_snapshot(store_path, "float16")
+    assert manifest["index"]["type"] == "float16"
+    store = SnapshotStore.open(store_path)
+    assert [text for _, text in store.items()] == ["alpha", "beta"]
+    assert (tmp_path / "store" / "bm25.json").exists()
@@ -0,0 +1,44 @@
+from store_registry import VectorStoreRegistry
+
+
+def test_get_loads_once_and_then_hits():
+    registry = VectorStoreRegistry()
+    calls = []
+    loader = lambda: (calls.append(1) or "store", 10)
+    assert registry.get("a", loader) == "store"
+    assert registry.get("a", loader) == "store"
+    assert len(calls) == 1
+    assert registry.stats()["hits"] == 1 and registry.stats()["misses"] == 1
+
+
+def test_missing_key_does_not_leak_its_loading_lock():
+    registry = VectorStoreRegistry()
+    assert registry.get("missing", lambda: (None, 0)) is None
+    assert registry._loading == {}
+
+
+def test_invalidated_while_loading_is_not_cached_and_lock_is_released():
+    registry = VectorStoreRegistry()
+
+    def loader():
+        registry.invalidate("a")
+        return "stale", 1
+
+    assert registry.get("a", loader) == "stale"
+    assert registry.keys() == []
+    assert registry._loading == {}
+
+
+def test_evicts_least_recently_used_over_entry_and_byte_budgets():
+    registry = VectorStoreRegistry(max_entries=2)
+    registry.put("a", "A")
+    registry.put("b", "B")
+    registry.get("a", lambda: (None, 0))
+    registry.put("c", "C")
+    assert registry.keys() == ["a", "c"]
+
+    registry = VectorStoreRegistry(max_entries=0, max_bytes=100)
+    registry.put("a", "A", 60)
+    registry.put("b", "B", 60)
+    assert registry.keys() == ["b"]
+    assert registry.stats()["evictions"] == 1
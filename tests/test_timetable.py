@@ -0,0 +1,40 @@
+from timetable import TimetableIndex, load_timetable, parse_timetable, save_timetable
+
+EVENTS = [
+    {"start": "09:00 AM", "end": "10:00 AM", "event": "Explore Booths", "venue": "Block A"},
+    {"start": "10:00 AM", "end": "11:00 AM", "event": "Campus Tour", "venue": None},
+]
+
+
+def test_parse_timetable_handles_broken_spacing():
+    events = parse_timetable("09:00AM - 10:00 AM : Explore Booths - Venue: Block A 03 :00PM-04:00PM Campus Tour")
+    assert [(e["start"], e["end"], e["event"], e["venue"]) for e in events] == [
+        ("09:00 AM", "10:00 AM", "Explore Booths", "Block A"),
+        ("03:00 PM", "04:00 PM", "Campus Tour", None),
+    ]
+
+
+def test_answers_where_and_what_questions():
+    index = TimetableIndex(EVENTS)
+    assert index.answer("Where is the explore booth?") == "The Explore Booths is in Block A, from 09:00 AM to 10:00 AM."
+    assert index.answer("What is on at 10:30 AM?") == "At 10:30 AM: Campus Tour (10:00 AM - 11:00 AM)."
+    assert index.answer("Tell me about the library") is None
+
+
+def test_curated_table_is_kept_for_the_same_pdf_only(tmp_path):
+    path = str(tmp_path / "schedule.json")
+    save_timetable(path, EVENTS[:1], "h1", source="curated")
+
+    assert not save_timetable(path, EVENTS, "h1")
+    assert load_timetable(path)["source"] == "curated"
+
+    assert save_timetable(path, EVENTS, "h2")
+    assert load_timetable(path) == {"source": "parsed", "source_hash": "h2", "events": EVENTS}
+
+
+def test_changed_pdf_without_events_drops_the_table(tmp_path):
+    path = str(tmp_path / "schedule.json")
+    save_timetable(path, EVENTS, "h1", source="curated")
+    assert save_timetable(path, [], "h2")
+    assert load_timetable(path) is None
+    assert not save_timetable(path, [], "h2")
@@ -0,0 +1,65 @@
+import asyncio
+
+from translation import PIVOT_LANGUAGE, TranslationCache, resolve_language
+
+
+def test_resolve_language_accepts_labels_and_codes():
+    assert resolve_language("中文") == resolve_language("zh") == "Chinese (Simplified)"
+    assert resolve_language("Klingon") == resolve_language(None) == PIVOT_LANGUAGE
+
+
+def test_cache_counts_hits_and_evicts_least_recent():
+    cache = TranslationCache(max_entries=2)
+    cache.put("one", "Thai", "หนึ่ง")
+    cache.put("two", "Thai", "สอง")
+    assert cache.get("one", "Thai") == "หนึ่ง"
+    cache.put("three", "Thai", "สาม")
+    assert cache.get("two", "Thai") is None
+    assert cache.get("one", "Korean") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_cache_entries_expire_after_ttl(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("translation.time.time", lambda: now[0])
+    cache = TranslationCache(ttl=10)
+    cache.put("hello", "Thai", "สวัสดี")
+    now[0] = 11
+    assert cache.get("hello", "Thai") is None
+
+
+def test_concurrent_async_translations_share_one_call():
+    cache = TranslationCache()
+    calls = []
+
+    async def translate():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "สวัสดี"
+
+    async def run():
+        first = await asyncio.gather(*(cache.get_or_translate("hello", "Thai", translate) for _ in range(5)))
+        again = await cache.get_or_translate("hello", "Thai", translate)
+        return first, again
+
+    first, again = asyncio.run(run())
+    assert first == ["สวัสดี"] * 5 and again == "สวัสดี"
+    assert len(calls) == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_translation():
+    cache = TranslationCache()
+
+    async def translate():
+        await asyncio.sleep(0.01)
+        return "สวัสดี"
+
+    async def run():
+        waiter = asyncio.ensure_future(cache.get_or_translate("hello", "Thai", translate))
+        other = asyncio.ensure_future(cache.get_or_translate("hello", "Thai", translate))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        return await other
+
+    assert asyncio.run(run()) == "สวัสดี"
+    assert cache.get("hello", "Thai") == "สวัสดี"
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from upstream import BULK, INTERACTIVE, ScheduledEmbeddings, TokenBucket, UpstreamBusy, UpstreamScheduler
+
+
+def test_token_bucket_refills_and_caps_oversized_requests():
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.wait_time(60, now=bucket.updated) == 0.0
+    bucket.take(60, now=bucket.updated)
+    assert bucket.wait_time(1, now=bucket.updated) == pytest.approx(1.0)
+    assert bucket.wait_time(1000, now=bucket.updated) == pytest.approx(60.0)
+    assert TokenBucket(per_minute=0).wait_time(10 ** 6, now=0.0) == 0.0
+
+
+def test_retryable_errors_are_retried_then_succeed():
+    scheduler = UpstreamScheduler(backoff_base=0.001)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError("429 rate limit")
+        return "ok"
+
+    assert scheduler.call("m", flaky) == "ok"
+    assert scheduler.stats()["retried"] == 2 and scheduler.stats()["active"] == 0
+
+    with pytest.raises(ValueError):
+        scheduler.call("m", lambda: (_ for _ in ()).throw(ValueError("bad request")))
+    assert scheduler.stats()["failed"] == 1
+
+
+def test_expired_deadline_raises_busy_with_retry_after():
+    scheduler = UpstreamScheduler(limits={"m": {"rpm": 1}})
+    scheduler.call("m", lambda: None)
+    with pytest.raises(UpstreamBusy) as error:
+        scheduler.call("m", lambda: None, deadline=time.monotonic() + 0.05)
+    assert error.value.retry_after >= 1
+    assert scheduler.stats()["expired"] == 1
+
+
+def test_interactive_calls_are_admitted_before_bulk():
+    scheduler = UpstreamScheduler(max_concurrency=1)
+    scheduler.acquire("m")
+    order = []
+
+    def wait(priority, name):
+        scheduler.acquire("m", priority=priority)
+        order.append(name)
+        scheduler.release()
+
+    threads = [threading.Thread(target=wait, args=(BULK, "bulk"))]
+    threads[0].start()
+    while not scheduler.stats()["queue_depth"]["bulk"]:
+        time.sleep(0.001)
+    threads.append(threading.Thread(target=wait, args=(INTERACTIVE, "interactive")))
+    threads[1].start()
+    while not scheduler.stats()["queue_depth"]["interactive"]:
+        time.sleep(0.001)
+    scheduler.release()
+    for thread in threads:
+        thread.join()
+    assert order == ["interactive", "bulk"]
+
+
+def test_cancelled_async_caller_leaves_the_queue_uncharged():
+    scheduler = UpstreamScheduler(limits={"m": {"rpm": 2}}, max_concurrency=1)
+    scheduler.acquire("m")  # holds the only slot
+
+    async def run():
+        call = asyncio.ensure_future(scheduler.acall("m", asyncio.sleep, 0))
+        while not scheduler.stats()["queue_depth"]["interactive"]:
+            await asyncio.sleep(0.001)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        for _ in range(1000):
+            if not scheduler.stats()["queue_depth"]["interactive"]:
+                break
+            await asyncio.sleep(0.001)
+
+    asyncio.run(run())
+    assert scheduler.stats()["queue_depth"]["interactive"] == 0
+    scheduler.release()
+    stats = scheduler.stats()
+    assert (stats["admitted"], stats["active"]) == (1, 0)
+    # Only the held slot was charged, so one request of the rpm budget is left
+    assert scheduler.buckets["m"][0].wait_time(1, time.monotonic()) == 0.0
+
+
+def test_embedding_batches_are_charged_per_text():
+    class Embeddings:
+        def embed_documents(self, texts):
+            return [[1.0] for _ in texts]
+
+    scheduler = UpstreamScheduler(limits={"m": {"rpm": 10}})
+    embeddings = ScheduledEmbeddings(Embeddings, scheduler, "m", BULK)
+    assert embeddings.embed_documents(["a", "b", "c"]) == [[1.0]] * 3
+    assert scheduler.buckets["m"][0].level == pytest.approx(7, abs=0.1)
+
+
+def test_queued_bulk_calls_do_not_count_against_interactive_admission():
+    scheduler = UpstreamScheduler(max_concurrency=1, max_queue=1)
+    scheduler.acquire("m")  # holds the only slot
+    bulk = threading.Thread(target=lambda: (scheduler.acquire("m", priority=BULK), scheduler.release()))
+    bulk.start()
+    while not scheduler.stats()["queue_depth"]["bulk"]:
+        time.sleep(0.001)
+
+    # The queue is full for bulk work, but an interactive call may still wait for a slot
+    with pytest.raises(UpstreamBusy):
+        scheduler.acquire("m", priority=BULK)
+    interactive = threading.Thread(target=lambda: (scheduler.acquire("m"), scheduler.release()))
+    interactive.start()
+    while not scheduler.stats()["queue_depth"]["interactive"]:
+        time.sleep(0.001)
+    assert scheduler.stats()["rejected"] == 1
+
+    scheduler.release()
+    for thread in (interactive, bulk):
+        thread.join()
+    assert scheduler.stats()["admitted"] == 3
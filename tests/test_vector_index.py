@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from conftest import write_store
+from snapshot_store import SnapshotStore, rebuild_snapshot
+from vector_index import ExactIndex, build_index, resolve_params
+
+
+def random_vectors(n=256, dim=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def write(store_path, vectors, index_type, index_params=None):
+    write_store(store_path, [f"chunk {i}" for i in range(len(vectors))], vectors, index_type, index_params)
+
+
+def test_resolve_params_merges_defaults_and_rejects_unknown_types():
+    assert resolve_params("ivf", {"nprobe": "2", "bogus": 1}) == {"nlist": 64, "nprobe": 2}
+    with pytest.raises(ValueError):
+        resolve_params("hnsw")
+
+
+def test_exact_search_matches_brute_force_in_blocks():
+    vectors = random_vectors()
+    query = vectors[17] + 0.01
+    distances, rows = ExactIndex(vectors).search(query, 3)
+    expected = np.argsort(((vectors - query) ** 2).sum(axis=1))[:3]
+    assert list(rows) == list(expected)
+    assert np.allclose(distances, ((vectors[expected] - query) ** 2).sum(axis=1), atol=1e-4)
+
+    _, rows16 = build_index(vectors, "float16").search(query, 1)
+    assert rows16[0] == 17
+
+
+def test_float16_store_keeps_full_vectors_and_rebuilds_exactly(tmp_path):
+    vectors = random_vectors()
+    store_path = str(tmp_path / "store")
+    write(store_path, vectors, "float16")
+    store = SnapshotStore.open(store_path)
+    assert store.vectors.dtype == np.float32
+    assert store.nbytes < vectors.nbytes
+    assert store.search(vectors[5], k=1)[0][0].page_content == "chunk 5"
+
+    rebuild_snapshot(store_path, "flat")
+    assert np.array_equal(SnapshotStore.open(store_path).all_vectors(), vectors)
+
+
+def test_float16_only_store_cannot_be_rebuilt(tmp_path):
+    store_path = str(tmp_path / "store")
+    write(store_path, random_vectors(), "float16")
+    np.save(str(tmp_path / "store" / "vectors.npy"), random_vectors().astype(np.float16))
+    with pytest.raises(ValueError):
+        rebuild_snapshot(store_path, "flat")
+
+
+def test_pq_store_is_charged_for_its_codes_not_its_vectors(tmp_path):
+    pytest.importorskip("faiss")
+    vectors = random_vectors(n=2048, dim=32)
+    store_path = str(tmp_path / "store")
+    write(store_path, vectors, "pq", {"m": 8, "nbits": 6})
+    store = SnapshotStore.open(store_path)
+    assert store.nbytes < vectors.nbytes / 4
+    assert "chunk 3" in [doc.page_content for doc, _ in store.search(vectors[3], k=5)]
+
+
+def test_store_opened_before_a_rebuild_keeps_its_index(tmp_path):
+    pytest.importorskip("faiss")
+    vectors = random_vectors()
+    store_path = str(tmp_path / "store")
+    write(store_path, vectors, "ivf", {"nlist": 4, "nprobe": 4})
+    store = SnapshotStore.open(store_path)
+
+    rebuild_snapshot(store_path, "flat")
+    rebuild_snapshot(store_path, "float16")
+    assert store.search(vectors[9], k=1)[0][0].page_content == "chunk 9"
+    assert store.document("id-chunk 9").page_content == "chunk 9"
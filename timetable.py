@@ -0,0 +1,160 @@
+import json
+import os
+import re
+
+from lexical_index import word_tokens
+
+# Matches "09:00 AM", "09:00AM" and the broken spacing PdfReader produces ("03 :00PM")
+TIME_PATTERN = r"(\d{1,2})\s*:\s*(\d\s*\d)\s*([AaPp])\.?\s*[Mm]\.?"
+RANGE_RE = re.compile(TIME_PATTERN + r"\s*(?:-|–|—|to)?\s*" + TIME_PATTERN)
+TIME_RE = re.compile(TIME_PATTERN)
+VENUE_RE = re.compile(r"\s*-?\s*Venue\s*:?\s*(.+)$", re.IGNORECASE)
+
+# Words that describe the question rather than the event being asked about
+QUESTION_WORDS = {
+    "where", "when", "what", "which", "who", "how", "time", "times", "venue", "location",
+    "is", "are", "was", "the", "a", "an", "of", "for", "in", "at", "on", "to", "and", "be",
+    "held", "located", "does", "do", "did", "will", "start", "starts", "end", "ends", "finish",
+    "take", "takes", "place", "happen", "happening", "happens", "i", "me", "my", "we", "can",
+    "find", "go", "attend", "there", "it", "that", "this", "please", "tell", "s", "whats", "wheres",
+}
+
+
+def to_minutes(hour, minute, meridiem):
+    hour = int(hour) % 12
+    if meridiem.lower() == "p":
+        hour += 12
+    return hour * 60 + int(minute.replace(" ", ""))
+
+
+def format_minutes(minutes):
+    hour, minute = divmod(minutes, 60)
+    meridiem = "PM" if hour >= 12 else "AM"
+    return f"{(hour % 12) or 12:02d}:{minute:02d} {meridiem}"
+
+
+def tokenize(text, stop_words=frozenset()):
+    return set(word_tokens(text, stop_words))
+
+
+def parse_timetable(text):
+    # Parse "start - end : event - Venue: place" entries out of extracted PDF text
+    events = []
+    matches = list(RANGE_RE.finditer(text))
+    for i, match in enumerate(matches):
+        segment_end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        segment = " ".join(text[match.end():segment_end].split()).strip(" :-–")
+
+        venue = None
+        venue_match = VENUE_RE.search(segment)
+        if venue_match:
+            venue = venue_match.group(1).strip(" .;")
+            segment = segment[:venue_match.start()].strip(" :-–")
+        if not segment:
+            continue
+
+        events.append({
+            "start": format_minutes(to_minutes(*match.group(1, 2, 3))),
+            "end": format_minutes(to_minutes(*match.group(4, 5, 6))),
+            "event": segment[:200],
+            "venue": venue[:80] if venue else None,
+        })
+    return events
+
+
+def format_timetable(events):
+    # Render events in the layout the prompt has always used
+    lines = []
+    for event in events:
+        line = f"{event['start']} - {event['end']} : {event['event']}"
+        if event.get("venue"):
+            line += f" - Venue: {event['venue']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class TimetableIndex:
+    """Lookup index over parsed timetable events, by event name and time slot."""
+
+    def __init__(self, events):
+        self.events = events
+        self._tokens = [tokenize(event["event"]) for event in events]
+        self._slots = sorted(
+            (to_minutes(*TIME_RE.match(event["start"]).groups()),
+             to_minutes(*TIME_RE.match(event["end"]).groups()), i)
+            for i, event in enumerate(events)
+        )
+
+    def find_by_name(self, query):
+        # Every content word of the question must appear in the event name
+        wanted = tokenize(query, QUESTION_WORDS)
+        if not wanted:
+            return []
+        return [event for event, tokens in zip(self.events, self._tokens) if wanted <= tokens]
+
+    def find_by_time(self, minutes):
+        return [self.events[i] for start, end, i in self._slots if start <= minutes < end]
+
+    def answer(self, query, max_events=3):
+        # Deterministic answer for simple where/when questions, or None to fall back to the LLM
+        question = query.lower()
+        asks_where = bool(re.search(r"\b(where|venue|location|which (block|room|hall))\b", question))
+        asks_when = bool(re.search(r"\b(when|what time|start|end|finish)\b", question))
+
+        time_match = TIME_RE.search(query)
+        if time_match and re.search(r"\b(what|which)\b", question) and not asks_where:
+            events = self.find_by_time(to_minutes(*time_match.groups()))
+            if not events or len(events) > max_events * 3:
+                return None
+            at = format_minutes(to_minutes(*time_match.groups()))
+            return f"At {at}: " + "; ".join(self._describe(event) for event in events) + "."
+
+        if not (asks_where or asks_when):
+            return None
+        events = self.find_by_name(query)
+        if not events or len(events) > max_events:
+            return None
+
+        answers = []
+        for event in events:
+            if asks_where and event.get("venue"):
+                answers.append(f"The {event['event']} is in {event['venue']}, from {event['start']} to {event['end']}.")
+            elif asks_when:
+                venue = f" in {event['venue']}" if event.get("venue") else ""
+                answers.append(f"The {event['event']} runs from {event['start']} to {event['end']}{venue}.")
+            else:
+                return None
+        return " ".join(answers)
+
+    @staticmethod
+    def _describe(event):
+        venue = f", {event['venue']}" if event.get("venue") else ""
+        return f"{event['event']} ({event['start']} - {event['end']}{venue})"
+
+
+def load_timetable(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_timetable(path, events, source_hash, source="parsed"):
+    # A table belongs to one version of its PDF: a curated table survives re-ingesting that
+    # version, but a changed PDF replaces it, or removes it when the parser finds no events.
+    # Returns whether the stored table changed.
+    existing = load_timetable(path)
+    if (existing and existing.get("source") == "curated" and source != "curated"
+            and existing.get("source_hash") == source_hash):
+        return False
+    if not events:
+        if existing is None:
+            return False
+        os.remove(path)
+        return True
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump({"source": source, "source_hash": source_hash, "events": events}, file, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return True
@@ -0,0 +1,105 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# Retrieval, caching and generation all happen in the pivot language; questions are
+# translated into it and answers out of it, once per (text, language).
+PIVOT_LANGUAGE = "English"
+
+# Client labels (see languages.json) and ISO codes -> the language name used in prompts
+LANGUAGE_NAMES = {
+    "english": "English", "en": "English",
+    "中文": "Chinese (Simplified)", "chinese": "Chinese (Simplified)", "zh": "Chinese (Simplified)",
+    "မြန်မာ": "Burmese", "burmese": "Burmese", "my": "Burmese",
+    "tiếng việt": "Vietnamese", "vietnamese": "Vietnamese", "vi": "Vietnamese",
+    "ไทย": "Thai", "thai": "Thai", "th": "Thai",
+    "한국어": "Korean", "korean": "Korean", "ko": "Korean",
+    "日本語": "Japanese", "japanese": "Japanese", "ja": "Japanese",
+}
+
+
+def resolve_language(value):
+    # Unknown or missing languages fall back to the pivot language
+    return LANGUAGE_NAMES.get(str(value or "").strip().lower(), PIVOT_LANGUAGE)
+
+
+def build_translation_prompt(text, source, target):
+    return (
+            f"Translate the following text from {source} to {target}. Keep the names of places, buildings, "
+            "events and times unchanged. Reply with the translation only.\n\n"
+            f"{text}"
+        )
+
+
+class TranslationCache:
+    """Translations keyed by (source text, other language), with LRU eviction."""
+
+    def __init__(self, max_entries=5000, ttl=0):
+        self.max_entries = max_entries
+        self.ttl = ttl  # seconds, 0 disables expiry
+        self._entries = OrderedDict()  # (text hash, language) -> (translation, created)
+        self._lock = threading.Lock()
+        # Striped locks so concurrent requests for the same translation make one upstream call
+        self._stripes = [threading.Lock() for _ in range(64)]
+        self._pending = {}  # key -> asyncio.Task, the async counterpart (event loop thread only)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(text, language):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest(), language
+
+    def get(self, text, language, count=True):
+        key = self._key(text, language)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.time() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += count
+                return None
+            self._entries.move_to_end(key)
+            self.hits += count
+            return entry[0]
+
+    def key_lock(self, text, language):
+        # Hold while translating; re-check the cache with get(count=False) once acquired
+        return self._stripes[hash(self._key(text, language)) % len(self._stripes)]
+
+    async def get_or_translate(self, text, language, translate):
+        # Cached translation, or the result of translate() (a coroutine function); concurrent
+        # callers on the event loop await one shared translation
+        translation = self.get(text, language)
+        if translation is not None:
+            return translation
+        key = self._key(text, language)
+        task = self._pending.get(key)
+        if task is None:
+            async def compute():
+                result = await translate()
+                self.put(text, language, result)
+                return result
+
+            task = self._pending[key] = asyncio.ensure_future(compute())
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        # Shield so one caller being cancelled does not cancel the shared translation
+        return await asyncio.shield(task)
+
+    def put(self, text, language, translation):
+        with self._lock:
+            self._entries[self._key(text, language)] = (translation, time.time())
+            while self.max_entries and len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
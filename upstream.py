@@ -0,0 +1,329 @@
+import asyncio
+import itertools
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Admission priorities: interactive chat is always admitted ahead of bulk ingestion work
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+# Exception names / message fragments that mean "try again later" rather than a bad request
+RETRYABLE_NAMES = {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+                   "DeadlineExceeded", "Timeout", "TimeoutError", "ConnectionError"}
+RETRYABLE_MESSAGES = ("429", "503", "quota", "rate limit", "resource exhausted", "unavailable", "timed out")
+
+
+class UpstreamBusy(Exception):
+    """Raised instead of calling upstream when it cannot be done in time; carries a Retry-After hint."""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+def is_retryable(error):
+    if type(error).__name__ in RETRYABLE_NAMES:
+        return True
+    message = str(error).lower()
+    return any(fragment in message for fragment in RETRYABLE_MESSAGES)
+
+
+class TokenBucket:
+    """Continuously refilling bucket; a per-minute rate of 0 means unlimited."""
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        # Seconds until amount can be taken (0 when it can be taken now)
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)  # an oversized request waits for a full bucket, not forever
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount, now):
+        # May go negative: completion tokens are charged after the call, as debt
+        if self.rate:
+            self._refill(now)
+            self.level -= amount
+
+
+class _Waiter:
+    def __init__(self, priority, seq, model, tokens, deadline, requests=1):
+        self.priority = priority
+        self.seq = seq
+        self.model = model
+        self.tokens = tokens
+        self.requests = requests
+        self.deadline = deadline
+        self.enqueued = time.monotonic()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class UpstreamScheduler:
+    """Central admission control for embedding and LLM calls.
+
+    Every call waits in a bounded priority queue until a concurrency slot and
+    the model's request/token budget are free, is retried with jittered
+    exponential backoff on quota and availability errors, and fails fast with
+    UpstreamBusy when the queue ahead of it is full or its deadline passes.
+    """
+
+    def __init__(self, limits=None, max_concurrency=8, max_queue=64, retries=3, backoff_base=0.5,
+                 backoff_max=8.0, wait_histogram=None):
+        # limits: {model: {"rpm": requests per minute, "tpm": tokens per minute}}
+        self.buckets = {
+            model: (TokenBucket(limit.get("rpm", 0)), TokenBucket(limit.get("tpm", 0)))
+            for model, limit in (limits or {}).items()
+        }
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.wait_histogram = wait_histogram
+        self._waiting = []
+        self._active = 0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._admission_pool = None  # threads that wait for admission on behalf of async callers
+        self.admitted = 0
+        self.rejected = 0
+        self.expired = 0
+        self.retried = 0
+        self.failed = 0
+        self._service_seconds = 1.0  # moving average, used for Retry-After hints
+
+    # Synchronous calls
+
+    def call(self, model, fn, tokens=0, priority=INTERACTIVE, deadline=None, requests=1):
+        # Run fn() upstream; deadline is the latest time.monotonic() at which it may still be admitted.
+        # requests is what the call counts against the model's rpm budget (e.g. texts in a batch).
+        attempt = 0
+        while True:
+            self.acquire(model, tokens, priority, deadline, requests)
+            started = time.monotonic()
+            try:
+                return fn()
+            except Exception as e:
+                if not self._should_retry(e, attempt, deadline):
+                    raise
+            finally:
+                self.release(time.monotonic() - started)
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+
+    def stream(self, model, factory, tokens=0, priority=INTERACTIVE, deadline=None):
+        # Iterate factory() upstream; retried only if it fails before its first item
+        attempt = 0
+        while True:
+            self.acquire(model, tokens, priority, deadline)
+            started = time.monotonic()
+            yielded = False
+            try:
+                for item in factory():
+                    yielded = True
+                    yield item
+                return
+            except Exception as e:
+                if yielded or not self._should_retry(e, attempt, deadline):
+                    raise
+            finally:
+                self.release(time.monotonic() - started)
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+
+    # Asynchronous calls (CHAT_MODE=async); admission waits off the event loop
+
+    async def acall(self, model, factory, tokens=0, priority=INTERACTIVE, deadline=None):
+        attempt = 0
+        while True:
+            await self._acquire_async(model, tokens, priority, deadline)
+            started = time.monotonic()
+            try:
+                return await factory()
+            except Exception as e:
+                if not self._should_retry(e, attempt, deadline):
+                    raise
+            finally:
+                self.release(time.monotonic() - started)
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def _acquire_async(self, model, tokens, priority, deadline):
+        with self._cond:
+            if self._admission_pool is None:
+                self._admission_pool = ThreadPoolExecutor(max_workers=max(1, self.max_queue))
+        withdrawn = threading.Event()
+        admission = self._admission_pool.submit(self.acquire, model, tokens, priority, deadline, 1, withdrawn)
+        try:
+            await asyncio.wrap_future(admission)
+        except asyncio.CancelledError:
+            # A cancelled caller (e.g. a discarded speculative fallback) leaves the queue without
+            # being admitted or charged; one admitted just before hands its slot back
+            with self._cond:
+                withdrawn.set()
+                self._cond.notify_all()
+            admission.add_done_callback(lambda f: not f.cancelled() and f.exception() is None and f.result()
+                                        and self.release())
+            raise
+
+    def charge(self, model, tokens):
+        # Charge tokens only known after the call (the completion) to the model's budget
+        buckets = self.buckets.get(model)
+        if buckets and tokens:
+            with self._cond:
+                buckets[1].take(tokens, time.monotonic())
+
+    # Admission
+
+    def acquire(self, model, tokens=0, priority=INTERACTIVE, deadline=None, requests=1, withdrawn=None):
+        # True once admitted; False if the withdrawn event was set while waiting.
+        # Only waiters at the caller's priority or above count against max_queue, so queued
+        # bulk work never gets interactive calls rejected.
+        with self._cond:
+            if sum(1 for w in self._waiting if w.priority <= priority) >= self.max_queue:
+                self.rejected += 1
+                raise UpstreamBusy("Upstream queue is full", self._retry_after())
+            waiter = _Waiter(priority, next(self._seq), model, tokens, deadline, requests)
+            self._waiting.append(waiter)
+            try:
+                while True:
+                    if withdrawn is not None and withdrawn.is_set():
+                        return False
+                    now = time.monotonic()
+                    if deadline is not None and now >= deadline:
+                        self.expired += 1
+                        raise UpstreamBusy("Upstream queue wait exceeded the deadline", self._retry_after())
+                    timeout = 0.5
+                    if self._active < self.max_concurrency and self._next_admissible(now) is waiter:
+                        wait = self._budget_wait(waiter, now)
+                        if not wait:
+                            self._admit(waiter, now)
+                            return True
+                        timeout = wait
+                    if deadline is not None:
+                        timeout = min(timeout, deadline - now)
+                    self._cond.wait(max(timeout, 0.001))
+            finally:
+                if waiter in self._waiting:
+                    self._waiting.remove(waiter)
+                    self._cond.notify_all()
+
+    def release(self, service_seconds=None):
+        with self._cond:
+            self._active -= 1
+            if service_seconds is not None:
+                self._service_seconds = 0.9 * self._service_seconds + 0.1 * service_seconds
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for waiter in self._waiting:
+                depth[PRIORITY_NAMES[waiter.priority]] += 1
+            return {
+                "queue_depth": depth,
+                "oldest_wait_seconds": max((now - w.enqueued for w in self._waiting), default=0.0),
+                "active": self._active,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "expired": self.expired,
+                "retried": self.retried,
+                "failed": self.failed,
+            }
+
+    def _next_admissible(self, now):
+        # Highest-priority waiter whose model has budget; otherwise the head waits for its budget
+        ordered = sorted(self._waiting)
+        for waiter in ordered:
+            if not self._budget_wait(waiter, now):
+                return waiter
+        return ordered[0] if ordered else None
+
+    def _budget_wait(self, waiter, now):
+        buckets = self.buckets.get(waiter.model)
+        if not buckets:
+            return 0.0
+        return max(buckets[0].wait_time(waiter.requests, now), buckets[1].wait_time(waiter.tokens, now))
+
+    def _admit(self, waiter, now):
+        buckets = self.buckets.get(waiter.model)
+        if buckets:
+            buckets[0].take(waiter.requests, now)
+            buckets[1].take(waiter.tokens, now)
+        self._waiting.remove(waiter)
+        self._active += 1
+        self.admitted += 1
+        if self.wait_histogram is not None:
+            self.wait_histogram.observe(now - waiter.enqueued, PRIORITY_NAMES[waiter.priority])
+
+    def _should_retry(self, error, attempt, deadline):
+        retry = (attempt < self.retries and is_retryable(error)
+                 and (deadline is None or time.monotonic() + self._backoff_cap(attempt) < deadline))
+        with self._cond:
+            if retry:
+                self.retried += 1
+            else:
+                self.failed += 1
+        return retry
+
+    def _backoff_cap(self, attempt):
+        return min(self.backoff_max, self.backoff_base * 2 ** attempt)
+
+    def _backoff(self, attempt):
+        # Full jitter, so retries from many requests do not arrive together
+        return random.uniform(0, self._backoff_cap(attempt))
+
+    def _retry_after(self):
+        return len(self._waiting) * self._service_seconds / max(1, self.max_concurrency) or 1
+
+
+class ScheduledEmbeddings:
+    """Embeddings client whose calls go through the scheduler at a fixed priority.
+
+    A batch is charged one request per text against the model's rpm budget, the conservative
+    reading of per-minute quotas. Token charges come from estimate_tokens, a local estimate
+    (about four characters per token in the backend), not the provider's count.
+    """
+
+    def __init__(self, get_embeddings, scheduler, model, priority=INTERACTIVE, estimate_tokens=len, deadline=None):
+        self.get_embeddings = get_embeddings
+        self.scheduler = scheduler
+        self.model = model
+        self.priority = priority
+        self.estimate_tokens = estimate_tokens
+        self.deadline = deadline  # seconds a call may wait for admission, None to wait indefinitely
+
+    def _deadline(self):
+        return time.monotonic() + self.deadline if self.deadline else None
+
+    def embed_documents(self, texts):
+        tokens = sum(self.estimate_tokens(text) for text in texts)
+        return self.scheduler.call(self.model, lambda: self.get_embeddings().embed_documents(texts),
+                                   tokens, self.priority, self._deadline(), requests=max(1, len(texts)))
+
+    def embed_query(self, text):
+        return self.scheduler.call(self.model, lambda: self.get_embeddings().embed_query(text),
+                                   self.estimate_tokens(text), self.priority, self._deadline())
+
+    async def aembed_query(self, text):
+        return await self.scheduler.acall(self.model, lambda: self.get_embeddings().aembed_query(text),
+                                          self.estimate_tokens(text), self.priority, self._deadline())
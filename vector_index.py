@@ -0,0 +1,133 @@
+import os
+
+import numpy as np
+
+# Vector index types a snapshot can be built with:
+#   flat     exact search over float32 vectors (the baseline)
+#   float16  exact search over half-precision vectors, half the bytes
+#   ivf      FAISS inverted file: searches the nprobe nearest of nlist clusters
+#   pq       FAISS product quantisation: m sub-vectors of nbits each
+#   ivfpq    both, the smallest and fastest for large stores
+INDEX_TYPES = ("flat", "float16", "ivf", "pq", "ivfpq")
+FAISS_TYPES = ("ivf", "pq", "ivfpq")
+DEFAULT_PARAMS = {
+    "ivf": {"nlist": 64, "nprobe": 8},
+    "pq": {"m": 16, "nbits": 8},
+    "ivfpq": {"nlist": 64, "nprobe": 8, "m": 16, "nbits": 8},
+}
+
+# Rows scored per block by exact search, so float16 stores are never upcast all at once
+BLOCK_ROWS = 4096
+
+
+def resolve_params(index_type, params=None):
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Index type must be one of {', '.join(INDEX_TYPES)}")
+    merged = dict(DEFAULT_PARAMS.get(index_type, {}))
+    merged.update({key: int(value) for key, value in (params or {}).items() if key in merged})
+    return merged
+
+
+class ExactIndex:
+    """Brute-force squared-L2 search over a (possibly memory-mapped) matrix."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self._norms = None
+
+    @property
+    def nbytes(self):
+        return self.vectors.nbytes
+
+    def search(self, query, k):
+        # Returns (distances, rows), closest first
+        n = len(self.vectors)
+        if not n:
+            return np.empty(0, np.float32), np.empty(0, np.int64)
+        query = np.asarray(query, dtype=np.float32)
+        if self._norms is None:
+            self._norms = np.concatenate([
+                np.einsum("ij,ij->i", block, block) for block in self._blocks()
+            ])
+        distances = np.empty(n, np.float32)
+        for start, block in zip(range(0, n, BLOCK_ROWS), self._blocks()):
+            distances[start:start + len(block)] = self._norms[start:start + len(block)] - 2 * (block @ query)
+        distances += query @ query
+        k = min(k, n)
+        rows = np.argpartition(distances, k - 1)[:k]
+        rows = rows[np.argsort(distances[rows])]
+        return distances[rows], rows
+
+    def _blocks(self):
+        for start in range(0, len(self.vectors), BLOCK_ROWS):
+            yield np.asarray(self.vectors[start:start + BLOCK_ROWS], dtype=np.float32)
+
+
+class FaissIndex:
+    """A trained FAISS IVF/PQ index, stored as index.faiss next to the snapshot."""
+
+    FILE_NAME = "index.faiss"
+
+    def __init__(self, index, params):
+        self.index = index
+        self.params = params
+        if "nprobe" in params:
+            index.nprobe = params["nprobe"]
+
+    @classmethod
+    def train(cls, vectors, index_type, params):
+        import faiss
+
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n, dim = vectors.shape
+        params = dict(params)
+        # Small stores cannot train many clusters or large codebooks
+        if "nlist" in params:
+            params["nlist"] = max(1, min(params["nlist"], n // 4 or 1))
+            params["nprobe"] = min(params["nprobe"], params["nlist"])
+        if "nbits" in params:
+            while params["nbits"] > 1 and 2 ** params["nbits"] > n:
+                params["nbits"] -= 1
+        if "m" in params and dim % params["m"]:
+            raise ValueError(f"PQ m={params['m']} must divide the vector dimension {dim}")
+
+        if index_type == "ivf":
+            index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, params["nlist"])
+        elif index_type == "pq":
+            index = faiss.IndexPQ(dim, params["m"], params["nbits"])
+        else:
+            index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, params["nlist"], params["m"], params["nbits"])
+        index.train(vectors)
+        index.add(vectors)
+        return cls(index, params)
+
+    @classmethod
+    def load(cls, store_path, params):
+        import faiss
+
+        return cls(faiss.read_index(os.path.join(store_path, cls.FILE_NAME)), params)
+
+    def save(self, store_path):
+        import faiss
+
+        faiss.write_index(self.index, os.path.join(store_path, self.FILE_NAME))
+
+    @property
+    def nbytes(self):
+        import faiss
+
+        return len(faiss.serialize_index(self.index))
+
+    def search(self, query, k):
+        query = np.asarray(query, dtype=np.float32).reshape(1, -1)
+        distances, rows = self.index.search(query, k)
+        found = rows[0] >= 0
+        return distances[0][found], rows[0][found]
+
+
+def build_index(vectors, index_type, params=None):
+    # An in-memory index over vectors (float32 array) of the given type
+    params = resolve_params(index_type, params)
+    if index_type in FAISS_TYPES:
+        return FaissIndex.train(vectors, index_type, params)
+    return ExactIndex(np.asarray(vectors, dtype=np.float16 if index_type == "float16" else np.float32))